@@ -1,9 +1,31 @@
 '''
 This file extracts data from debugged process.
 It is much fastet than sending commands, if you wonder.
+GDB imports it once per session (see GDBDebugger.gdb_init_input), so module level state is kept between stops.
 '''
 import gdb # type: ignore
+import codecs
+import ctypes
+import hashlib
+import math
+import os
+import struct
+from itertools import islice
+from time import perf_counter
 from typing import Optional, Any
+from libstdcxx.v6.printers import type_cache, type_name # type: ignore
+
+MAX_CHILDREN: int = 1000 # How many elements of one array/container are extracted
+MAX_DEPTH: int = 6 # How deep nested values (structs in vectors in maps...) are extracted
+MIN_REPEATS: int = 4 # Shortest run of equal array elements, which is sent as one "repeat" item
+MAX_ELEMENTS: int = 10000 # How many array/container elements of one variable are extracted in total (e.g. int dp[1000][1000])
+MAX_CHECKSUM_BYTES: int = 1 << 22 # Bigger globals are always extracted again, hashing them would cost more than extracting
+OUTPUT_FILE: str = "/tmp/output" # Program's stdout, appended to by the debugged program (run ... >> /tmp/output)
+MAX_OUTPUT_CHUNK: int = 1 << 16 # How many new bytes of program's output are sent at once, only the tail is sent if there are more
+MAX_OUTPUT_FILE_SIZE: int = 1 << 23 # After that many bytes output file is emptied (when program is stopped), if already read bytes can't be freed
+FALLOC_FL_KEEP_SIZE: int = 0x01
+FALLOC_FL_PUNCH_HOLE: int = 0x02
+MAX_PROFILED_VARIABLES: int = 20 # How many slowest variables are listed in "profile"
 
 DEBUGDATA_TEMPLATE: dict[str: Any] = {
     "is_running": True,
@@ -13,53 +35,516 @@ DEBUGDATA_TEMPLATE: dict[str: Any] = {
     "function": "",
     "function_return_type": "",
     "line": 0,
-    "global_variables": [],
+    "global_variables": [], # Globals unchanged since the last stop are sent as {"variable_name": ..., "unchanged": True}
     "local_variables": [],
     "arguments": [],
-    "stdout": ""
+    "types": {},
+    "printer_cache": {},
+    "stdout": "", # Only output written since the last stop
+    "stdout_truncated": False, # Whether some output before "stdout" was skipped
+    "cpu_time": 0.0, # CPU time used by the program so far, in seconds
+    "profile": {} # Cost of this extraction (see Profile.export)
+}
+
+# struct formats of array elements, which can be read from memory all at once
+RAW_ELEMENT_FORMATS: dict[tuple[int, bool]: str] = {
+    (1, True): "b", (1, False): "B",
+    (2, True): "h", (2, False): "H",
+    (4, True): "i", (4, False): "I",
+    (8, True): "q", (8, False): "Q",
 }
 
-def format_symbol(frame: gdb.Frame, symbol: gdb.Symbol) -> Optional[dict[str: str]]:
+class SymbolIndex:
+	'''
+	Variables of the debugged binary, built once when it is loaded.
+	Maps every lexical block of the user's source to the variables visible in it (including the enclosing blocks)
+	and lists the user's globals, so nothing has to be looked up or filtered again on every stop.
+	'''
+	def __init__(self) -> None:
+		main_symbol = gdb.lookup_global_symbol("main")
+		self.filename: str = main_symbol.symtab.filename # Only symbols from this file are user's, not libstdc++ internals
+		self.blocks: dict[tuple[int, int]: tuple[list[gdb.Symbol], list[gdb.Symbol]]] = {} # (start, end) of block -> (locals, arguments)
+
+		self.global_variables: list[gdb.Symbol] = []
+		names = set()
+		for block in [main_symbol.symtab.global_block(), main_symbol.symtab.static_block()]:
+			for symbol in block:
+				if symbol.is_variable and symbol.name not in names and symbol.symtab and symbol.symtab.filename == self.filename:
+					names.add(symbol.name)
+					self.global_variables.append(symbol)
+
+		for line in main_symbol.symtab.linetable():
+			block = gdb.block_for_pc(line.pc)
+			if block:
+				self.scope(block)
+
+	def scope(self, block: gdb.Block) -> tuple[list[gdb.Symbol], list[gdb.Symbol]]:
+		'''
+		Returns locals and arguments visible in block. Inner variables shadow outer ones with the same name.
+		'''
+		key = (block.start, block.end)
+		if key not in self.blocks:
+			local_variables = []
+			arguments = []
+			names = set()
+			while block and not block.is_static and not block.is_global:
+				for symbol in block:
+					if symbol.name in names:
+						continue
+					if symbol.is_argument:
+						names.add(symbol.name)
+						arguments.append(symbol)
+					elif symbol.is_variable:
+						names.add(symbol.name)
+						local_variables.append(symbol)
+				if block.function:
+					break
+				block = block.superblock
+			self.blocks[key] = (local_variables, arguments)
+		return self.blocks[key]
+
+class Profile:
+	'''
+	Cost of one extraction: time of reading output and of every variable, and of every pretty printer class.
+	Printer's time is counted also without its nested printers ("self"), so e.g. vector<map<...>> shows, which of them is slow.
+	'''
+	def __init__(self) -> None:
+		self.start: float = perf_counter()
+		self.output_seconds: float = 0
+		self.variables: list[tuple[str, str, float, int]] = [] # (name, scope, seconds, elements)
+		self.printers: dict[str: list[float]] = {} # Printer class -> [calls, seconds, self seconds, elements (also of nested printers)]
+		self.elements: int = 0 # Array/container elements extracted for the current variable
+		self.nested_seconds: float = 0 # Time of printers nested in the current one
+
+	def printer(self, name: str, seconds: float, self_seconds: float, elements: int) -> None:
+		stats = self.printers.get(name)
+		if stats is None:
+			stats = self.printers[name] = [0, 0.0, 0.0, 0]
+		stats[0] += 1
+		stats[1] += seconds
+		stats[2] += self_seconds
+		stats[3] += elements
+
+	def export(self) -> dict[str: Any]:
+		slowest = sorted(self.variables, key=lambda variable: variable[2], reverse=True)[:MAX_PROFILED_VARIABLES]
+		variable_seconds: dict[str: list[float]] = {}
+		for _, scope, seconds, _ in self.variables:
+			variable_seconds.setdefault(scope, []).append(round(seconds, 6))
+		return {
+			"seconds": perf_counter() - self.start,
+			"output_seconds": self.output_seconds,
+			"variables_count": len(self.variables),
+			"variables_seconds": sum(variable[2] for variable in self.variables),
+			"variables": [{"name": name, "scope": scope, "seconds": seconds, "elements": elements} for name, scope, seconds, elements in slowest],
+			"variable_seconds": variable_seconds, # Scope -> times of all variables, for metrics
+			"printers": {name: {"calls": int(calls), "seconds": seconds, "self_seconds": self_seconds, "elements": int(elements)} for name, (calls, seconds, self_seconds, elements) in self.printers.items()}
+		}
+
+type_ids: dict[str: int] = {} # Type name -> id, for every type sent in this session
+new_types: dict[int: str] = {} # Types which were not sent to the server yet
+index: Optional[SymbolIndex] = None # Built on the first stop of every loaded binary
+global_checksums: dict[str: bytes] = {} # Global name -> checksum of its memory, when it was last sent
+flat_types: dict[str: bool] = {} # Type name -> whether its whole value lies in its own memory (see is_flat)
+output_offset: int = 0 # How many bytes of OUTPUT_FILE were already read
+output_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace") # Keeps UTF-8 characters split between two reads
+elements_left: int = MAX_ELEMENTS # Element budget of currently extracted variable
+profile: Profile = Profile() # Of the current extraction
+
+def reset() -> None:
+	'''
+	Forgets session state. Used when a new binary is loaded.
+	'''
+	global index
+	type_ids.clear()
+	new_types.clear()
+	global_checksums.clear()
+	flat_types.clear()
+	index = None
+
+def on_new_objfile(event: Any) -> None:
+	if event.new_objfile.filename == gdb.current_progspace().filename:
+		reset()
+
+gdb.events.new_objfile.connect(on_new_objfile)
+
+def type_id(type_: gdb.Type) -> int:
+	name = type_name(type_)
+	if name not in type_ids:
+		type_ids[name] = len(type_ids)
+		new_types[type_ids[name]] = name
+	return type_ids[name]
+
+def is_char(type_: gdb.Type) -> bool:
+	return type_.code == gdb.TYPE_CODE_CHAR or (type_.code == gdb.TYPE_CODE_INT and type_.sizeof == 1 and "char" in str(type_))
+
+def to_scalar(value: gdb.Value, type_: gdb.Type) -> Any:
+	'''
+	Numbers and bools are sent as they are, everything else as formatted by GDB.
+	'''
+	try:
+		if type_.code == gdb.TYPE_CODE_BOOL:
+			return bool(value)
+		if type_.code == gdb.TYPE_CODE_INT and not is_char(type_):
+			return int(value)
+		if type_.code == gdb.TYPE_CODE_FLT:
+			number = float(value)
+			if math.isfinite(number):
+				return number
+	except gdb.error:
+		pass
+	return value.format_string()
+
+def compress(items: list[dict[str: Any]]) -> list[dict[str: Any]]:
+	'''
+	Run-length compression of equal neighbouring items.
+	'''
+	out = []
+	i = 0
+	while i < len(items):
+		j = i
+		while j + 1 < len(items) and items[j + 1] == items[i]:
+			j += 1
+		if j - i + 1 >= MIN_REPEATS:
+			out.append({"kind": "repeat", "count": j - i + 1, "value": items[i]})
+		else:
+			out.extend(items[i:j + 1])
+		i = j + 1
+	return out
+
+def read_raw_array(value: gdb.Value, element: gdb.Type, length: int) -> Optional[list[dict[str, Any]]]:
+	'''
+	Reads array of numbers with one memory read, instead of one gdb.Value per element.
+	'''
+	if value.address is None:
+		return None
+	if length == 0:
+		return []
+
+	if element.code == gdb.TYPE_CODE_INT and not is_char(element):
+		format_ = RAW_ELEMENT_FORMATS.get((element.sizeof, element.is_signed))
+	elif element.code == gdb.TYPE_CODE_FLT and element.sizeof in (4, 8):
+		format_ = "f" if element.sizeof == 4 else "d"
+	elif element.code == gdb.TYPE_CODE_BOOL and element.sizeof == 1:
+		format_ = "?"
+	else:
+		return None
+
+	if not format_:
+		return None
+
+	memory = gdb.selected_inferior().read_memory(int(value.address), length * element.sizeof)
+	numbers = struct.unpack(f"={length}{format_}", bytes(memory))
+	element_id = type_id(element)
+	return [{"kind": "scalar", "type": element_id, "value": n if not isinstance(n, float) or math.isfinite(n) else str(n)} for n in numbers]
+
+def take_elements(wanted: int) -> int:
+	'''
+	Takes up to wanted elements from the budget of currently extracted variable.
+	'''
+	global elements_left
+	taken = max(min(wanted, elements_left), 0)
+	elements_left -= taken
+	return taken
+
+def from_array(value: gdb.Value, type_: gdb.Type, out: dict[str: Any], depth: int) -> dict[str: Any]:
+	element = type_.target().strip_typedefs()
+	if is_char(element):
+		out["value"] = value.format_string()
+		return out
+
+	low, high = type_.range()
+	length = high - low + 1
+	shown = take_elements(min(length, MAX_CHILDREN))
+
+	out["kind"] = "array"
+	out["length"] = length
+	out["truncated"] = shown < length
+	profile.elements += shown
+
+	items = read_raw_array(value, element, shown)
+	if items is None:
+		items = [to_structure(value[low + i], depth + 1) for i in range(shown)]
+	out["items"] = compress(items)
+	return out
+
+def from_fields(value: gdb.Value, type_: gdb.Type, out: dict[str: Any], depth: int) -> dict[str: Any]:
+	out["kind"] = "struct"
+	out["fields"] = []
+	for field in type_.fields():
+		if not hasattr(field, "bitpos"): # static members
+			continue
+		name = field.name if field.name else ""
+		if field.is_base_class:
+			name = str(field.type)
+		out["fields"].append([name, to_structure(value[field], depth + 1)])
+	return out
+
+def from_child(child: Any, depth: int) -> dict[str: Any]:
+	if isinstance(child, gdb.Value):
+		return to_structure(child, depth)
+	if isinstance(child, float) and not math.isfinite(child): # nan/inf would break literal_eval on the server
+		return {"kind": "scalar", "type": None, "value": str(child)}
+	return {"kind": "scalar", "type": None, "value": child if isinstance(child, (int, float, bool)) else str(child)}
+
+def from_printer(value: gdb.Value, printer: Any, out: dict[str: Any], depth: int) -> dict[str: Any]:
+	'''
+	Builds value from the children()/display_hint() protocol of pretty printers, measuring the printer's cost.
+	'''
+	outer_nested_seconds = profile.nested_seconds
+	profile.nested_seconds = 0
+	elements = profile.elements
+	start = perf_counter()
+	try:
+		return from_printer_children(value, printer, out, depth)
+	finally:
+		seconds = perf_counter() - start
+		profile.printer(type(printer).__name__, seconds, seconds - profile.nested_seconds, profile.elements - elements)
+		profile.nested_seconds = outer_nested_seconds + seconds
+
+def from_printer_children(value: gdb.Value, printer: Any, out: dict[str: Any], depth: int) -> dict[str: Any]:
+	hint = printer.display_hint() if hasattr(printer, "display_hint") else None
+
+	if hint == "string" or not hasattr(printer, "children"):
+		summary = printer.to_string() if hasattr(printer, "to_string") else None
+		if isinstance(summary, gdb.Value) and hint != "string":
+			return to_structure(summary, depth + 1) # Counts as a level, so chains of such printers stop at MAX_DEPTH
+		out["value"] = value.format_string()
+		return out
+
+	summary = printer.to_string() if hasattr(printer, "to_string") else None
+	if summary is not None:
+		out["summary"] = summary.format_string() if isinstance(summary, gdb.Value) else str(summary)
+
+	if depth >= MAX_DEPTH:
+		out["truncated"] = True
+		return out
+
+	# Budget is charged only for pulled children, so small containers don't use up MAX_CHILDREN each
+	per_element = 2 if hint == "map" else 1 # Map's children alternate keys and values
+	limit = min(MAX_CHILDREN, max(elements_left, 0)) * per_element
+	children = list(islice(printer.children(), limit + 1))
+	out["truncated"] = len(children) > limit
+	children = children[:limit]
+	profile.elements += take_elements(len(children) // per_element)
+
+	if hint == "map":
+		out["kind"] = "map"
+		out["entries"] = [[from_child(children[i][1], depth + 1), from_child(children[i + 1][1], depth + 1)] for i in range(0, len(children) - 1, 2)]
+	elif hint == "array" or all(str(name).startswith("[") for name, _ in children):
+		out["kind"] = "array"
+		out["items"] = compress([from_child(child, depth + 1) for _, child in children])
+	else:
+		out["kind"] = "struct"
+		out["fields"] = [[str(name), from_child(child, depth + 1)] for name, child in children]
+	return out
+
+def to_structure(value: gdb.Value, depth: int = 0) -> dict[str: Any]:
+	'''
+	Turns gdb.Value into a tree of scalars, arrays, maps and structs.
+	'''
+	try:
+		if value.type.code in (gdb.TYPE_CODE_REF, gdb.TYPE_CODE_RVALUE_REF):
+			value = value.referenced_value()
+
+		out = {"kind": "scalar", "type": type_id(value.type)}
+		type_ = value.type.strip_typedefs()
+
+		printer = gdb.default_visualizer(value)
+		if printer is not None:
+			return from_printer(value, printer, out, depth)
+
+		if type_.code == gdb.TYPE_CODE_ARRAY and depth < MAX_DEPTH:
+			return from_array(value, type_, out, depth)
+
+		if type_.code in (gdb.TYPE_CODE_STRUCT, gdb.TYPE_CODE_UNION) and depth < MAX_DEPTH:
+			return from_fields(value, type_, out, depth)
+
+		out["value"] = to_scalar(value, type_)
+		return out
+	except Exception as e:
+		return {"kind": "error", "type": None, "value": str(e)}
+
+def is_flat(type_: gdb.Type) -> bool:
+	'''
+	Whether the whole value lies in the variable's own memory (numbers, arrays and structs of them).
+	Values of containers, strings or pointers live somewhere else, so their memory says nothing about changes.
+	'''
+	type_ = type_.strip_typedefs()
+	name = type_name(type_)
+	if name not in flat_types:
+		if type_.code in (gdb.TYPE_CODE_INT, gdb.TYPE_CODE_FLT, gdb.TYPE_CODE_BOOL, gdb.TYPE_CODE_CHAR, gdb.TYPE_CODE_ENUM):
+			flat_types[name] = True
+		elif type_.code == gdb.TYPE_CODE_ARRAY:
+			flat_types[name] = is_flat(type_.target())
+		elif type_.code in (gdb.TYPE_CODE_STRUCT, gdb.TYPE_CODE_UNION):
+			flat_types[name] = all(is_flat(field.type) for field in type_.fields() if hasattr(field, "bitpos"))
+		else:
+			flat_types[name] = False
+	return flat_types[name]
+
+def global_checksum(symbol: gdb.Symbol) -> Optional[bytes]:
+	'''
+	Checksum of global's memory, or None if changes of the global can't be found this way.
+	'''
+	try:
+		if symbol.type.sizeof > MAX_CHECKSUM_BYTES or not is_flat(symbol.type):
+			return None
+		address = symbol.value().address
+		if address is None:
+			return None
+		memory = gdb.selected_inferior().read_memory(int(address), symbol.type.sizeof)
+		return hashlib.blake2b(memory, digest_size=16).digest()
+	except (gdb.error, RuntimeError):
+		return None
+
+def format_symbol(frame: gdb.Frame, symbol: gdb.Symbol, scope: str) -> Optional[dict[str: Any]]:
+	global elements_left
+	elements_left = MAX_ELEMENTS
+	profile.elements = 0
+	start = perf_counter()
 	try:
 		name = symbol.name
-		type_ = str(symbol.type)
-		value = frame.read_var(name).format_string()
-		
-		if len(value) > 400:
-			value = f"{value[:400]}..."
-			
+		type_ = type_id(symbol.type)
+		value = to_structure(symbol.value(frame) if symbol.needs_frame else symbol.value())
+
 		return {"variable_name": name, "variable_type": type_, "variable_value": value}
 	except Exception:
 		return
+	finally:
+		profile.variables.append((symbol.name, scope, perf_counter() - start, profile.elements))
+
+try:
+	libc = ctypes.CDLL(None, use_errno=True)
+	libc.fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong)
+except (OSError, AttributeError):
+	libc = None
+
+def skip_continuation_bytes(chunk: bytes) -> bytes:
+	'''
+	Drops the rest of a UTF-8 character, whose beginning was skipped.
+	'''
+	i = 0
+	while i < min(len(chunk), 3) and 0x80 <= chunk[i] < 0xc0:
+		i += 1
+	return chunk[i:]
+
+def free_read_output(fd: int, end: int) -> bool:
+	'''
+	Frees the first end bytes of output file (already read), so output never fills the tmpfs, while the program keeps appending.
+	Punching a hole keeps the file's size, so offsets don't change and nothing written in the meantime is lost.
+	:return: Whether it is supported
+	'''
+	if libc is None or end == 0:
+		return libc is not None
+	return libc.fallocate(fd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, 0, end) == 0
+
+def read_output(truncate: bool = True) -> dict[str: Any]:
+	'''
+	Reads program's output written since the last call.
+	If there is more than MAX_OUTPUT_CHUNK bytes, only the tail is returned.
+	Read bytes are freed right away (see free_read_output), so only unread output takes space in the tmpfs.
+	:param truncate: Whether output file can be emptied, when freeing isn't supported (only when program is stopped, otherwise some output could be lost)
+	'''
+	global output_offset
+	out = {"stdout": "", "stdout_truncated": False}
+
+	try:
+		with open(OUTPUT_FILE, "r+b") as f:
+			size = f.seek(0, 2)
+			if size < output_offset: # File was emptied by someone else
+				output_offset = 0
+				output_decoder.reset()
+			start = max(output_offset, size - MAX_OUTPUT_CHUNK)
+			f.seek(start)
+			chunk = f.read(size - start)
+			if start > output_offset: # Skipped bytes could end in the middle of a character
+				output_decoder.reset()
+				chunk = skip_continuation_bytes(chunk)
+			out["stdout"] = output_decoder.decode(chunk)
+			out["stdout_truncated"] = start > output_offset
+			output_offset = size
+			freed = free_read_output(f.fileno(), output_offset)
+	except FileNotFoundError:
+		return out
+
+	if truncate and not freed and output_offset > MAX_OUTPUT_FILE_SIZE:
+		# Program appends to the file, so it continues writing from the beginning
+		os.truncate(OUTPUT_FILE, 0)
+		output_offset = 0
+
+	return out
+
+def cpu_time() -> float:
+	'''
+	CPU time (user + system) used so far by the debugged program, in seconds.
+	'''
+	pid = gdb.selected_inferior().pid
+	if not pid:
+		return 0.0
+	try:
+		with open(f"/proc/{pid}/stat", "r") as f:
+			fields = f.read().rsplit(")", 1)[1].split() # Program name (in brackets) can contain spaces
+	except OSError:
+		return 0.0
+	return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def progress() -> dict[str: Any]:
+	'''
+	State of running program: its new output and used CPU time.
+	'''
+	out = read_output(truncate=False)
+	out["cpu_time"] = cpu_time()
+	return out
+
+def main(known_globals: Optional[list[str]] = None) -> dict[str: Any]:
+	'''
+	:param known_globals: Globals, whose last value the server has, only these can be sent as unchanged (None - all sent ones)
+	'''
+	global profile
+	profile = Profile()
 
-def main() -> dict[str: Any]:
 	debug_data = dict(DEBUGDATA_TEMPLATE)
-	with open("/tmp/output", "r") as f:
-		debug_data["stdout"] = f.read()
-	
+	debug_data.update(read_output())
+	profile.output_seconds = perf_counter() - profile.start
+	debug_data["cpu_time"] = cpu_time()
+
 	if not gdb.selected_thread():
 		debug_data["is_running"] = False
+		debug_data["profile"] = profile.export()
 		return debug_data
-	
+
+	global index
+	if index is None:
+		index = SymbolIndex()
+
 	frame = gdb.selected_frame()
-	block = frame.block()
-	
+	try:
+		local_symbols, argument_symbols = index.scope(frame.block())
+	except RuntimeError: # No debug info for this frame
+		local_symbols, argument_symbols = [], []
+
 	local_variables = []
 	arguments = []
 	global_variables = []
-	
-	for symbol in block:
-		if symbol.is_variable:
-			pretty_symbol = format_symbol(frame, symbol)
-			if pretty_symbol: local_variables.append(pretty_symbol)
-		elif symbol.is_argument:
-			pretty_symbol = format_symbol(frame, symbol)
-			if pretty_symbol: arguments.append(pretty_symbol)
-	
-	for symbol in block.global_block:
-		if symbol.is_variable:
-			pretty_symbol = format_symbol(frame, symbol)
-			if pretty_symbol: global_variables.append(pretty_symbol)
+
+	for symbol in local_symbols:
+		pretty_symbol = format_symbol(frame, symbol, "local")
+		if pretty_symbol: local_variables.append(pretty_symbol)
+
+	for symbol in argument_symbols:
+		pretty_symbol = format_symbol(frame, symbol, "argument")
+		if pretty_symbol: arguments.append(pretty_symbol)
+
+	for symbol in index.global_variables:
+		checksum = global_checksum(symbol)
+		if checksum is not None and global_checksums.get(symbol.name) == checksum and (known_globals is None or symbol.name in known_globals):
+			global_variables.append({"variable_name": symbol.name, "unchanged": True})
+			continue
+
+		pretty_symbol = format_symbol(frame, symbol, "global")
+		if pretty_symbol:
+			global_variables.append(pretty_symbol)
+			if checksum is not None: global_checksums[symbol.name] = checksum
 
 	debug_data["function"] = frame.function().name
 	debug_data["function_return_type"] =  frame.function().type.target().name
@@ -67,8 +552,12 @@ def main() -> dict[str: Any]:
 	debug_data["global_variables"] = global_variables
 	debug_data["local_variables"] = local_variables
 	debug_data["arguments"] = arguments
+	debug_data["types"] = dict(new_types)
+	debug_data["printer_cache"] = type_cache.stats()
+	debug_data["profile"] = profile.export()
+	new_types.clear()
 
 	return debug_data
 
 if __name__ == "__main__":
-	print(main())
\ No newline at end of file
+	print(main())
@@ -102,18 +102,138 @@ if hasattr(gdb, 'ValuePrinter'):
 else:
     printer_base = object
 
+# Memo caches for type resolution.  Selecting a printer, finding node
+# types and rendering type names all repeat the same gdb.lookup_type and
+# strip_typedefs work for the same handful of types on every stop, so
+# the results are cached, keyed by type identity (see type_key).  All
+# caches are dropped when an objfile is loaded or unloaded, because names
+# may then resolve to different types.
+
+
+class _CachedError(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class TypeCache(object):
+    """Per-objfile memo caches with hit/miss counters."""
+
+    def __init__(self):
+        self._caches = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, key, compute):
+        """
+        Return the cached result of COMPUTE for KEY in cache KIND, calling
+        it on a miss.  Exceptions raised by COMPUTE are cached too.
+        """
+        cache = self._caches.setdefault(kind, {})
+        if key in cache:
+            self.hits += 1
+            result = cache[key]
+        else:
+            self.misses += 1
+            try:
+                result = compute()
+            except (gdb.error, ValueError) as e:
+                result = _CachedError(e)
+            cache[key] = result
+        if isinstance(result, _CachedError):
+            raise result.error.with_traceback(None)
+        return result
+
+    def clear(self, event=None):
+        self._caches.clear()
+
+    def stats(self):
+        """Return hits, misses, hit rate and number of entries per cache."""
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / total if total else 0.0,
+                'entries': dict((kind, len(cache))
+                                for kind, cache in self._caches.items())}
+
+
+type_cache = TypeCache()
+
+if hasattr(gdb, 'events'):
+    gdb.events.new_objfile.connect(type_cache.clear)
+    if hasattr(gdb.events, 'free_objfile'):
+        gdb.events.free_objfile.connect(type_cache.clear)
+    gdb.events.clear_objfiles.connect(type_cache.clear)
+
+
+def _qualifiers(typ):
+    """
+    Return None for an unqualified TYP, otherwise its full name, so that
+    const, volatile and const volatile variants get separate cache entries.
+    """
+    if typ == typ.unqualified():
+        return None
+    return str(typ)
+
+
+def type_key(typ):
+    """
+    Return a hashable identity of TYP built from cheap attributes, or None
+    when TYP cannot be identified that way (e.g. anonymous types).
+    """
+    code = typ.code
+    if code in (gdb.TYPE_CODE_PTR, gdb.TYPE_CODE_REF,
+                getattr(gdb, 'TYPE_CODE_RVALUE_REF', None)):
+        target = type_key(typ.target())
+        if target is None:
+            return None
+        return (code, _qualifiers(typ), target)
+    if code == gdb.TYPE_CODE_ARRAY:
+        target = type_key(typ.target())
+        if target is None:
+            return None
+        return (code, typ.sizeof, target)
+    name = typ.name
+    if name is None:
+        return None
+    objfile = getattr(typ, 'objfile', None)
+    return (code, name, objfile.filename if objfile is not None else None,
+            _qualifiers(typ))
+
+
+def cached_type(kind, typ, compute):
+    """Like type_cache.get, keyed by type_key(TYP) when TYP has one."""
+    key = type_key(typ)
+    if key is None:
+        return compute()
+    return type_cache.get(kind, key, compute)
+
+
+def lookup_type(name):
+    """Cached gdb.lookup_type(NAME)."""
+    return type_cache.get('lookup', name, lambda: gdb.lookup_type(name))
+
+
+def type_name(typ):
+    """Cached str(TYP), which otherwise runs every type printer."""
+    return cached_type('name', typ, lambda: str(typ))
+
+
 # Starting with the type ORIG, search for the member type NAME.  This
 # handles searching upward through superclasses.  This is needed to
 # work around http://sourceware.org/bugzilla/show_bug.cgi?id=13615.
 
 
 def find_type(orig, name):
+    return cached_type('member:' + name, orig, lambda: _find_type(orig, name))
+
+
+def _find_type(orig, name):
     typ = orig.strip_typedefs()
     while True:
         # Use Type.tag to ignore cv-qualifiers.  PR 67440.
         search = '%s::%s' % (typ.tag, name)
         try:
-            return gdb.lookup_type(search)
+            return lookup_type(search)
         except RuntimeError:
             pass
         # The type was not found, so try the superclass.  We only need
@@ -133,16 +253,17 @@ def lookup_templ_spec(templ, *args):
     """
     Lookup template specialization templ<args...>.
     """
-    t = '{}<{}>'.format(templ, ', '.join([str(a) for a in args]))
+    t = '{}<{}>'.format(templ, ', '.join([type_name(a) if isinstance(a, gdb.Type)
+                                          else str(a) for a in args]))
     try:
-        return gdb.lookup_type(t)
+        return lookup_type(t)
     except gdb.error as e:
         # Type not found, try again in versioned namespace.
         global _versioned_namespace
         if _versioned_namespace not in templ:
             t = t.replace('::', '::' + _versioned_namespace, 1)
             try:
-                return gdb.lookup_type(t)
+                return lookup_type(t)
             except gdb.error:
                 # If that also fails, rethrow the original exception
                 pass
@@ -163,6 +284,11 @@ def lookup_node_type(nodename, containertype):
     e.g. lookup_node_type('_List_node', gdb.lookup_type('std::list<int>'))
     will return a gdb.Type for the type std::_List_node<int>.
     """
+    return cached_type('node:' + nodename, containertype,
+                       lambda: _lookup_node_type(nodename, containertype))
+
+
+def _lookup_node_type(nodename, containertype):
     # If nodename is unqualified, assume it's in namespace std.
     if '::' not in nodename:
         nodename = 'std::' + nodename
@@ -234,6 +360,11 @@ def strip_inline_namespaces(type_str):
 
 def get_template_arg_list(type_obj):
     """Return a type's template arguments as a list."""
+    return list(cached_type('targs', type_obj,
+                            lambda: _get_template_arg_list(type_obj)))
+
+
+def _get_template_arg_list(type_obj):
     n = 0
     template_args = []
     while True:
@@ -244,6 +375,157 @@ def get_template_arg_list(type_obj):
         n += 1
 
 
+# Node-based containers (std::list, std::forward_list, std::map, std::set
+# and the unordered containers) are walked with raw memory reads of the
+# node headers instead of gdb.Value member access, which is by far the
+# slowest part of printing a big container.  Every walk is bounded by
+# NODE_BUDGET and stops on cycles or unreadable pointers, so a container
+# clobbered by the debugged program cannot hang the printer.
+
+NODE_BUDGET = 10000
+
+
+def _member_offset(typ, name):
+    """
+    Return the byte offset of member NAME inside TYP, searching base
+    classes too, or None if there is no such member.
+    """
+    typ = typ.strip_typedefs()
+    for field in typ.fields():
+        if field.name == name:
+            return field.bitpos // 8
+        if field.is_base_class:
+            offset = _member_offset(field.type, name)
+            if offset is not None:
+                return field.bitpos // 8 + offset
+    return None
+
+
+class NodeLayout(object):
+    """
+    Byte layout of a container node type: the offsets of its link pointers
+    and of the stored value.  Use node_layout() to get a cached instance.
+    """
+
+    def __init__(self, nodetype, links, value_members):
+        nodetype = nodetype.strip_typedefs()
+        self._ptrsize = gdb.lookup_type('void').pointer().sizeof
+        self._links = []
+        for name in links:
+            offset = _member_offset(nodetype, name)
+            if offset is None:
+                raise ValueError("Cannot find %s in %s" % (name, str(nodetype)))
+            self._links.append(offset)
+        self._span = max(self._links) + self._ptrsize
+        self._value_offset = None
+        for name in value_members:
+            self._value_offset = _member_offset(nodetype, name)
+            if self._value_offset is not None:
+                break
+        if self._value_offset is None:
+            raise ValueError("Unsupported implementation for %s" % str(nodetype))
+        self._value_ptr = nodetype.template_argument(0).pointer()
+
+    def read_links(self, address):
+        """Return the link pointers of the node at ADDRESS as integers."""
+        if address % self._ptrsize:
+            raise ValueError("Misaligned node address 0x%x" % address)
+        data = bytes(gdb.selected_inferior().read_memory(address, self._span))
+        size = self._ptrsize
+        return [int.from_bytes(data[o:o + size], sys.byteorder)
+                for o in self._links]
+
+    def value_at(self, address):
+        """Return the value stored in the node at ADDRESS."""
+        return gdb.Value(address + self._value_offset).cast(
+            self._value_ptr).dereference()
+
+
+def node_layout(nodetype, links, value_members=('_M_storage',)):
+    """Return the (cached) NodeLayout of NODETYPE for the given links."""
+    key = (nodetype.strip_typedefs().tag, tuple(links), tuple(value_members))
+    return type_cache.get('layout', key,
+                          lambda: NodeLayout(nodetype, links, value_members))
+
+
+class NodeWalk(object):
+    """
+    A bounded walk over the nodes of a container.  The generators yield
+    node addresses; when a walk ends early 'problem' says why.
+    """
+
+    def __init__(self, layout, limit=None):
+        self.layout = layout
+        self.problem = None
+        self.count = 0
+        # Without a known size the budget is the only bound.
+        self._budget_hit = limit is None or int(limit) > NODE_BUDGET
+        self._limit = NODE_BUDGET if self._budget_hit else max(int(limit), 0)
+        self._seen = set()
+
+    def _enter(self, address):
+        """Return the links of the node at ADDRESS or None to stop the walk."""
+        if address in self._seen:
+            self.problem = 'cycle at 0x%x' % address
+            return None
+        if len(self._seen) >= self._limit:
+            if self._budget_hit:
+                self.problem = 'stopped after %d nodes' % self._limit
+            else:
+                self.problem = 'more nodes than the container size'
+            return None
+        try:
+            links = self.layout.read_links(address)
+        except (gdb.error, ValueError):
+            self.problem = 'invalid node pointer 0x%x' % address
+            return None
+        self._seen.add(address)
+        return links
+
+    def linked(self, first, end=0):
+        """Follow the first link from FIRST until it reaches END."""
+        address = first
+        while address != end:
+            if address == 0:
+                self.problem = 'null link in circular list'
+                return
+            links = self._enter(address)
+            if links is None:
+                return
+            self.count += 1
+            yield address
+            address = links[0]
+
+    def rbtree(self, root):
+        """In-order walk of a binary tree linked by (left, right)."""
+        stack = []
+        address = root
+        while stack or address:
+            while address:
+                links = self._enter(address)
+                if links is None:
+                    return
+                stack.append((address, links[1]))
+                address = links[0]
+            address, right = stack.pop()
+            self.count += 1
+            yield address
+            address = right
+
+
+def node_walk_marker(walk, pairs=False):
+    """
+    Return the children that tell the user a walk ended early, if it did.
+    With PAIRS the marker is a key/value pair for 'map' display hints.
+    """
+    if walk is None or walk.problem is None:
+        return []
+    message = '<%s, %s>' % (num_elements(walk.count), walk.problem)
+    if pairs:
+        return [('[...]', '...'), ('[...]', message)]
+    return [('[...]', message)]
+
+
 class SmartPtrIterator(Iterator):
     """An iterator for smart pointer types with a single 'child' value."""
 
@@ -396,31 +678,33 @@ class StdListPrinter(printer_base):
 
     class _iterator(Iterator):
         def __init__(self, nodetype, head):
-            self._nodetype = nodetype
-            self._base = head['_M_next']
-            self._head = head.address
+            layout = node_layout(nodetype, ('_M_next',),
+                                 ('_M_storage', '_M_data'))
+            self._walk = NodeWalk(layout)
+            self._nodes = self._walk.linked(int(head['_M_next']),
+                                            int(head.address))
             self._count = 0
 
         def __iter__(self):
             return self
 
         def __next__(self):
-            if self._base == self._head:
-                raise StopIteration
-            elt = self._base.cast(self._nodetype).dereference()
-            self._base = elt['_M_next']
+            address = next(self._nodes)
             count = self._count
             self._count = self._count + 1
-            val = get_value_from_list_node(elt)
-            return ('[%d]' % count, val)
+            return ('[%d]' % count, self._walk.layout.value_at(address))
 
     def __init__(self, typename, val):
         self._typename = strip_versioned_namespace(typename)
         self._val = val
 
     def children(self):
-        nodetype = lookup_node_type('_List_node', self._val.type).pointer()
-        return self._iterator(nodetype, self._val['_M_impl']['_M_node'])
+        nodetype = lookup_node_type('_List_node', self._val.type)
+        nodes = self._iterator(nodetype, self._val['_M_impl']['_M_node'])
+        for child in nodes:
+            yield child
+        for child in node_walk_marker(nodes._walk):
+            yield child
 
     def to_string(self):
         headnode = self._val['_M_impl']['_M_node']
@@ -725,13 +1009,15 @@ class StdStackOrQueuePrinter(printer_base):
 class RbtreeIterator(Iterator):
     """
     Turn an RB-tree-based container (std::map, std::set etc.) into
-    a Python iterable object.
+    a Python iterable object yielding the addresses of its nodes in order.
+    The values are read with self.walk.layout.value_at(address).
     """
 
     def __init__(self, rbtree):
+        self._rbtree = rbtree
         self._size = rbtree['_M_t']['_M_impl']['_M_node_count']
-        self._node = rbtree['_M_t']['_M_impl']['_M_header']['_M_left']
-        self._count = 0
+        self._nodes = None
+        self.walk = None
 
     def __iter__(self):
         return self
@@ -740,26 +1026,14 @@ class RbtreeIterator(Iterator):
         return int(self._size)
 
     def __next__(self):
-        if self._count == self._size:
-            raise StopIteration
-        result = self._node
-        self._count = self._count + 1
-        if self._count < self._size:
-            # Compute the next node.
-            node = self._node
-            if node.dereference()['_M_right']:
-                node = node.dereference()['_M_right']
-                while node.dereference()['_M_left']:
-                    node = node.dereference()['_M_left']
-            else:
-                parent = node.dereference()['_M_parent']
-                while node == parent.dereference()['_M_right']:
-                    node = parent
-                    parent = parent.dereference()['_M_parent']
-                if node.dereference()['_M_right'] != parent:
-                    node = parent
-            self._node = node
-        return result
+        if self._nodes is None:
+            nodetype = lookup_node_type('_Rb_tree_node', self._rbtree.type)
+            layout = node_layout(nodetype, ('_M_left', '_M_right'),
+                                 ('_M_storage', '_M_value_field'))
+            self.walk = NodeWalk(layout, self._size)
+            root = self._rbtree['_M_t']['_M_impl']['_M_header']['_M_parent']
+            self._nodes = self.walk.rbtree(int(root))
+        return next(self._nodes)
 
 
 def get_value_from_Rb_tree_node(node):
@@ -826,10 +1100,9 @@ class StdMapPrinter(printer_base):
 
     # Turn an RbtreeIterator into a pretty-print iterator.
     class _iter(Iterator):
-        def __init__(self, rbiter, type):
+        def __init__(self, rbiter):
             self._rbiter = rbiter
             self._count = 0
-            self._type = type
 
         def __iter__(self):
             return self
@@ -837,8 +1110,7 @@ class StdMapPrinter(printer_base):
         def __next__(self):
             if self._count % 2 == 0:
                 n = next(self._rbiter)
-                n = n.cast(self._type).dereference()
-                n = get_value_from_Rb_tree_node(n)
+                n = self._rbiter.walk.layout.value_at(n)
                 self._pair = n
                 item = n['first']
             else:
@@ -856,8 +1128,11 @@ class StdMapPrinter(printer_base):
                                num_elements(len(RbtreeIterator(self._val))))
 
     def children(self):
-        node = lookup_node_type('_Rb_tree_node', self._val.type).pointer()
-        return self._iter(RbtreeIterator(self._val), node)
+        rbiter = RbtreeIterator(self._val)
+        for child in self._iter(rbiter):
+            yield child
+        for child in node_walk_marker(rbiter.walk, pairs=True):
+            yield child
 
     def display_hint(self):
         return 'map'
@@ -868,18 +1143,16 @@ class StdSetPrinter(printer_base):
 
     # Turn an RbtreeIterator into a pretty-print iterator.
     class _iter(Iterator):
-        def __init__(self, rbiter, type):
+        def __init__(self, rbiter):
             self._rbiter = rbiter
             self._count = 0
-            self._type = type
 
         def __iter__(self):
             return self
 
         def __next__(self):
             item = next(self._rbiter)
-            item = item.cast(self._type).dereference()
-            item = get_value_from_Rb_tree_node(item)
+            item = self._rbiter.walk.layout.value_at(item)
             # FIXME: this is weird ... what to do?
             # Maybe a 'set' display hint?
             result = ('[%d]' % self._count, item)
@@ -895,8 +1168,11 @@ class StdSetPrinter(printer_base):
                                num_elements(len(RbtreeIterator(self._val))))
 
     def children(self):
-        node = lookup_node_type('_Rb_tree_node', self._val.type).pointer()
-        return self._iter(RbtreeIterator(self._val), node)
+        rbiter = RbtreeIterator(self._val)
+        for child in self._iter(rbiter):
+            yield child
+        for child in node_walk_marker(rbiter.walk):
+            yield child
 
 
 class StdBitsetPrinter(printer_base):
@@ -1147,24 +1423,20 @@ class Tr1HashtableIterator(Iterator):
 
 class StdHashtableIterator(Iterator):
     def __init__(self, hashtable):
-        self._node = hashtable['_M_before_begin']['_M_nxt']
         valtype = hashtable.type.template_argument(1)
         cached = hashtable.type.template_argument(9).template_argument(0)
         node_type = lookup_templ_spec('std::__detail::_Hash_node', str(valtype),
                                       'true' if cached else 'false')
-        self._node_type = node_type.pointer()
+        self.walk = NodeWalk(node_layout(node_type, ('_M_nxt',)),
+                             hashtable['_M_element_count'])
+        self._nodes = self.walk.linked(
+            int(hashtable['_M_before_begin']['_M_nxt']))
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        if self._node == 0:
-            raise StopIteration
-        elt = self._node.cast(self._node_type).dereference()
-        self._node = elt['_M_nxt']
-        valptr = elt['_M_storage'].address
-        valptr = valptr.cast(elt.type.template_argument(0).pointer())
-        return valptr.dereference()
+        return self.walk.layout.value_at(next(self._nodes))
 
 
 class Tr1UnorderedSetPrinter(printer_base):
@@ -1191,7 +1463,14 @@ class Tr1UnorderedSetPrinter(printer_base):
         counter = imap(self._format_count, itertools.count())
         if self._typename.startswith('std::tr1'):
             return izip(counter, Tr1HashtableIterator(self._hashtable()))
-        return izip(counter, StdHashtableIterator(self._hashtable()))
+        return self._std_children(counter)
+
+    def _std_children(self, counter):
+        nodes = StdHashtableIterator(self._hashtable())
+        for child in izip(counter, nodes):
+            yield child
+        for child in node_walk_marker(nodes.walk):
+            yield child
 
 
 class Tr1UnorderedMapPrinter(printer_base):
@@ -1232,10 +1511,16 @@ class Tr1UnorderedMapPrinter(printer_base):
                 imap(self._format_one, Tr1HashtableIterator(self._hashtable())))
             # Zip the two iterators together.
             return izip(counter, data)
-        data = self._flatten(
-            imap(self._format_one, StdHashtableIterator(self._hashtable())))
+        return self._std_children(counter)
+
+    def _std_children(self, counter):
+        nodes = StdHashtableIterator(self._hashtable())
+        data = self._flatten(imap(self._format_one, nodes))
         # Zip the two iterators together.
-        return izip(counter, data)
+        for child in izip(counter, data):
+            yield child
+        for child in node_walk_marker(nodes.walk, pairs=True):
+            yield child
 
     def display_hint(self):
         return 'map'
@@ -1246,31 +1531,30 @@ class StdForwardListPrinter(printer_base):
 
     class _iterator(Iterator):
         def __init__(self, nodetype, head):
-            self._nodetype = nodetype
-            self._base = head['_M_next']
+            self._walk = NodeWalk(node_layout(nodetype, ('_M_next',)))
+            self._nodes = self._walk.linked(int(head['_M_next']))
             self._count = 0
 
         def __iter__(self):
             return self
 
         def __next__(self):
-            if self._base == 0:
-                raise StopIteration
-            elt = self._base.cast(self._nodetype).dereference()
-            self._base = elt['_M_next']
+            address = next(self._nodes)
             count = self._count
             self._count = self._count + 1
-            valptr = elt['_M_storage'].address
-            valptr = valptr.cast(elt.type.template_argument(0).pointer())
-            return ('[%d]' % count, valptr.dereference())
+            return ('[%d]' % count, self._walk.layout.value_at(address))
 
     def __init__(self, typename, val):
         self._val = val
         self._typename = strip_versioned_namespace(typename)
 
     def children(self):
-        nodetype = lookup_node_type('_Fwd_list_node', self._val.type).pointer()
-        return self._iterator(nodetype, self._val['_M_impl']['_M_head'])
+        nodetype = lookup_node_type('_Fwd_list_node', self._val.type)
+        nodes = self._iterator(nodetype, self._val['_M_impl']['_M_head'])
+        for child in nodes:
+            yield child
+        for child in node_walk_marker(nodes._walk):
+            yield child
 
     def to_string(self):
         if self._val['_M_impl']['_M_head']['_M_next'] == 0:
@@ -2405,8 +2689,8 @@ class Printer(object):
 
         return type.tag
 
-    def __call__(self, val):
-        typename = self.get_basic_type(val.type)
+    def _select(self, type):
+        typename = self.get_basic_type(type)
         if not typename:
             return None
 
@@ -2416,17 +2700,20 @@ class Printer(object):
         if not match:
             return None
 
-        basename = match.group(1)
+        return self._lookup.get(match.group(1))
+
+    def __call__(self, val):
+        printer = cached_type('printer', val.type,
+                              lambda: self._select(val.type))
+        if printer is None:
+            # Cannot find a pretty printer.  Return None.
+            return None
 
         if val.type.code == gdb.TYPE_CODE_REF:
             if hasattr(gdb.Value, "referenced_value"):
                 val = val.referenced_value()
 
-        if basename in self._lookup:
-            return self._lookup[basename].invoke(val)
-
-        # Cannot find a pretty printer.  Return None.
-        return None
+        return printer.invoke(val)
 
 
 libstdcxx_printer = None
@@ -2470,6 +2757,10 @@ class TemplateTypePrinter(object):
             if not type_obj.tag.startswith(self.name):
                 return None
 
+            return type_cache.get('template:' + self.name, type_obj.tag,
+                                  lambda: self._recognize(type_obj))
+
+        def _recognize(self, type_obj):
             template_args = get_template_arg_list(type_obj)
             displayed_args = []
             require_defaulted = False
@@ -2484,7 +2775,7 @@ class TemplateTypePrinter(object):
                     # Fail to recognize the type (by returning None)
                     # unless the actual argument is the same as the default.
                     try:
-                        if targ != gdb.lookup_type(defarg):
+                        if targ != lookup_type(defarg):
                             return None
                     except gdb.error:
                         # Type lookup failed, just use string comparison:
@@ -2625,9 +2916,13 @@ class FilteringTypePrinter(object):
                     # Filter didn't match.
                     return None
 
+            return type_cache.get('filter:' + self.name, type_obj.tag,
+                                  lambda: self._recognize(type_obj))
+
+        def _recognize(self, type_obj):
+            if self._type_obj is None:
                 try:
-                    self._type_obj = gdb.lookup_type(
-                        self.name).strip_typedefs()
+                    self._type_obj = lookup_type(self.name).strip_typedefs()
                 except:
                     pass
 
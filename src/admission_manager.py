@@ -0,0 +1,124 @@
+import os
+from collections import deque
+from time import time
+from typing import Callable, Optional
+
+from server import QUEUE_DEFAULT_ADMISSION_INTERVAL
+
+# Load of this host: CPU (load average per core) and used memory (fraction)
+def host_load() -> dict[str: float]:
+	memory = {}
+	with open("/proc/meminfo", "r") as f:
+		for line in f:
+			key, value = line.split(":", 1)
+			memory[key] = int(value.split()[0])
+
+	return {
+		"cpu": os.getloadavg()[0] / os.cpu_count(),
+		"memory": 1 - memory["MemAvailable"] / memory["MemTotal"]
+	}
+
+class RateLimiter:
+	"""
+	Token bucket per client
+	"""
+	def __init__(self, rate: float, burst: int):
+		"""
+		:param rate: Tokens added per second
+		:param burst: Size of the bucket
+		"""
+		self.rate = rate
+		self.burst = burst
+		self.buckets: dict[str: tuple[float, float]] = {} # Client -> (tokens, time of the last update)
+
+	def allow(self, client: str) -> bool:
+		now = time()
+		tokens, last = self.buckets.get(client, (self.burst, now))
+		tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+		if len(self.buckets) > 10000: # Full buckets carry no information
+			self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[0] + (now - bucket[1]) * self.rate < self.burst}
+
+		if tokens < 1:
+			self.buckets[client] = (tokens, now)
+			return False
+		self.buckets[client] = (tokens - 1, now)
+		return True
+
+class Ticket:
+	"""
+	Place of one start_debugging request in the queue
+	"""
+	def __init__(self, ip: str, sid: str):
+		self.ip = ip
+		self.sid = sid
+		self.cancelled: bool = False # Client has disconnected
+
+class AdmissionQueue:
+	"""
+	FIFO queue of start_debugging requests, which came when there was no capacity for a new session.
+	Every IP can wait only once, so nobody can take several places. Only the head of the queue is admitted, so nobody is overtaken.
+	"""
+	def __init__(self, has_capacity: Callable[[], bool], max_length: int):
+		"""
+		:param has_capacity: Tells, if a new session can be started now
+		:param max_length: How many requests can wait, further ones are rejected
+		"""
+		self.has_capacity = has_capacity
+		self.max_length = max_length
+		self.queue: deque[Ticket] = deque()
+		self.ips: set[str] = set()
+		self.admission_interval: float = QUEUE_DEFAULT_ADMISSION_INTERVAL # Average time between admissions from the queue, for ETA
+		self.last_admission_time: Optional[float] = None
+
+	def enter(self, ip: str, sid: str) -> tuple[Optional[Ticket], str]:
+		"""
+		:return: Ticket (None if rejected) and reason of rejection
+		"""
+		if ip in self.ips:
+			return (None, "Your IP is already waiting for debugging.")
+		if len(self.queue) >= self.max_length:
+			return (None, "Server is overloaded, please try again in a few minutes.")
+
+		ticket = Ticket(ip, sid)
+		self.queue.append(ticket)
+		self.ips.add(ip)
+		return (ticket, "")
+
+	def try_admit(self, ticket: Ticket) -> bool:
+		"""
+		Admits the ticket, if it is the head of the queue and there is capacity. Admitted ticket leaves the queue
+		"""
+		if not self.queue or self.queue[0] is not ticket or not self.has_capacity():
+			return False
+
+		self.leave(ticket)
+
+		now = time()
+		if self.last_admission_time is not None and self.queue:
+			self.admission_interval = 0.8 * self.admission_interval + 0.2 * (now - self.last_admission_time)
+		self.last_admission_time = now if self.queue else None # Intervals are measured only while somebody waits
+		return True
+
+	def leave(self, ticket: Ticket) -> None:
+		try:
+			self.queue.remove(ticket)
+		except ValueError:
+			return
+		self.ips.discard(ticket.ip)
+
+	def cancel_sid(self, sid: str) -> None:
+		"""
+		Removes requests of disconnected client
+		"""
+		for ticket in list(self.queue):
+			if ticket.sid == sid:
+				ticket.cancelled = True
+				self.leave(ticket)
+
+	def position(self, ticket: Ticket) -> dict[str: float]:
+		"""
+		:return: 1-based position in the queue and estimated waiting time in seconds
+		"""
+		position = self.queue.index(ticket) + 1
+		return {"position": position, "eta": round(position * self.admission_interval)}
@@ -0,0 +1,146 @@
+'''
+Debug agent for informejtycy online debugger;
+Runs debugging sessions (Compiler, DockerManager and GDBDebugger) on its node for the server, which puts new sessions on the least loaded agent;
+Server keeps one connection to every agent, requests and responses are JSON lines (see agent_manager.py);
+Listens on AGENT_BIND_ADDRESS and accepts only connections starting with AGENT_SECRET;
+Should be run as: python agent.py [port], several agents can run on one host on different ports (for testing, list them in DEBUG_AGENTS);
+'''
+
+import eventlet
+eventlet.monkey_patch() # Same as in app.py, so one session's GDB doesn't stop the others
+
+import os
+import sys
+import json
+import socket
+from threading import Lock
+from typing import Any
+
+from server import RECEIVED_DIR, DEBUG_DIR, GDB_PRINTERS_DIR, DATA_EXTRACTOR_DIR, AGENT_PORT, AGENT_BIND_ADDRESS, AGENT_SECRET, AGENT_REQUEST_TIMEOUT, LOG_DISPLAY_LAYER, LOG_BUFFER_SIZE, LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS
+from admission_manager import host_load
+from agent_manager import send_message, is_valid_session_name, is_authenticated
+from compiler_manager import Compiler
+from gdb_manager import GDBDebugger
+from logger import Logger, LogWriter
+
+# GDBDebugger methods, which can be called by the server
+CALLABLE_METHODS: set[str] = {"check_state_after_move", "poll_execution", "step", "continue_", "finish", "pause", "resume_state", "restart", "stop"}
+
+logger = Logger(display_logs=True, display_layer=LOG_DISPLAY_LAYER, max_logs=LOG_BUFFER_SIZE, writer=LogWriter(LOG_FILE.format(pid=os.getpid()), LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS) if LOG_FILE else None)
+compiler = Compiler(logger, 'g++', RECEIVED_DIR, DEBUG_DIR)
+sessions: dict[str: GDBDebugger] = {} # Source file name (unique for a session) -> its debugger
+
+os.makedirs(RECEIVED_DIR, exist_ok=True)
+os.makedirs(DEBUG_DIR, exist_ok=True)
+
+# Load of this node: CPU (load average per core), used memory (fraction) and sessions count
+def current_load() -> dict[str: float]:
+	return {**host_load(), "sessions": len(sessions)}
+
+# State of session, sent with every response, so the server knows if it still runs
+def session_state(debugger: GDBDebugger) -> dict[str: bool]:
+	return {"alive": debugger.process is not None, "is_executing": debugger.is_executing}
+
+# Starts a new session, code is saved as the session's source file
+def create_session(session: str, code: str, input_: str, ip: str) -> tuple[dict[str: Any], dict[str: bool]]:
+	with open(os.path.join(RECEIVED_DIR, session), 'w') as f:
+		f.write(code)
+
+	debugger = GDBDebugger(logger, compiler, DEBUG_DIR, GDB_PRINTERS_DIR, DATA_EXTRACTOR_DIR, session, ip)
+	with debugger.lock:
+		sessions[session] = debugger
+		run_exit_code, stdout = debugger.init_process(input_)
+
+		if not debugger.process: # Compilation or build failed, there is nothing to keep
+			debugger.stop()
+			del sessions[session]
+
+		result = {"run_exit_code": run_exit_code, "stdout": stdout.decode("utf-8", errors="replace"), "breakable_lines": debugger.breakpoints.breakable_lines}
+		return (result, session_state(debugger))
+
+# Calls a method of session's debugger
+def call_session(session: str, method: str, args: list[Any]) -> tuple[Any, dict[str: bool]]:
+	if method not in CALLABLE_METHODS:
+		raise ValueError(f"Method {method} can't be called")
+
+	debugger = sessions.get(session)
+	if debugger is None:
+		return (None, {"alive": False, "is_executing": False})
+
+	with debugger.lock:
+		result = getattr(debugger, method)(*args)
+		if not debugger.process:
+			sessions.pop(session, None)
+		return (result, session_state(debugger))
+
+# Handles one request and sends back its response
+def handle_request(connection: socket.socket, write_lock: Lock, request: dict[str: Any], owned: set[str]) -> None:
+	response = {"id": request["id"]}
+	params = request["params"]
+
+	try:
+		if request["method"] != "load" and not is_valid_session_name(params.get("session")):
+			raise ValueError("Invalid session name")
+
+		if request["method"] == "load":
+			response["result"] = current_load()
+		elif request["method"] == "create":
+			owned.add(params["session"])
+			response["result"], response["state"] = create_session(params["session"], params["code"], params["input"], params.get("ip", ""))
+		elif request["method"] == "call":
+			response["result"], response["state"] = call_session(params["session"], params["method"], params["args"])
+		else:
+			response["error"] = f"Unknown method {request['method']}"
+	except Exception as e:
+		logger.error("Request {} failed: {}", handle_request, request['method'], e)
+		response = {"id": request["id"], "error": str(e)}
+
+	try:
+		with write_lock:
+			send_message(connection, response)
+	except OSError as e:
+		logger.warn("Couldn't send response: {}", handle_request, e)
+
+# Serves one server connection. Sessions started through it are stopped, when it closes
+def serve_connection(connection: socket.socket, address: Any) -> None:
+	logger.info("Server connected: {}", serve_connection, address)
+
+	write_lock = Lock()
+	owned: set[str] = set()
+
+	try:
+		with connection.makefile("r", encoding="utf-8") as f:
+			connection.settimeout(AGENT_REQUEST_TIMEOUT) # Secret must come right away
+			if not is_authenticated(json.loads(f.readline() or "null"), AGENT_SECRET):
+				logger.warn("Connection from {} rejected, wrong secret", serve_connection, address)
+				return
+			connection.settimeout(None)
+			for line in f:
+				eventlet.spawn_n(handle_request, connection, write_lock, json.loads(line), owned)
+	except (OSError, ValueError) as e:
+		logger.warn("Connection with {} broke: {}", serve_connection, address, e)
+	finally:
+		connection.close()
+
+	logger.info("Server disconnected: {}, stopping its sessions", serve_connection, address)
+	for session in owned:
+		debugger = sessions.pop(session, None)
+		if debugger is not None:
+			with debugger.lock:
+				debugger.stop()
+
+def main() -> None:
+	if not AGENT_SECRET:
+		logger.error("AGENT_SECRET is not set, agent would let anyone run code", main)
+		sys.exit(1)
+
+	port = int(sys.argv[1]) if len(sys.argv) > 1 else AGENT_PORT
+	server = eventlet.listen((AGENT_BIND_ADDRESS, port))
+	logger.info("Debug agent is running on {}:{}", main, AGENT_BIND_ADDRESS, port)
+
+	while True:
+		connection, address = server.accept()
+		eventlet.spawn_n(serve_connection, connection, address)
+
+if __name__ == "__main__":
+	main()
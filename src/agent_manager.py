@@ -0,0 +1,255 @@
+import os
+import re
+import hmac
+import json
+import socket
+import eventlet
+from eventlet.event import Event
+from threading import Lock
+from time import time
+from typing import Any, Optional
+
+from breakpoint_manager import BreakpointManager
+from fair_lock import FairLock
+from logger import Logger
+from server import AGENT_HEARTBEAT_TIME, AGENT_HEARTBEAT_TIMEOUT, AGENT_REQUEST_TIMEOUT, AGENT_MAX_SESSIONS, AGENT_SECRET
+
+SESSION_NAME = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.cpp") # Source file name of a session, "<uuid4>.cpp"
+
+def send_message(connection: socket.socket, message: dict[str, Any]) -> None:
+	connection.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+# Tells, if session name can be used by agent as a file name (no path separators, nothing but "<uuid4>.cpp")
+def is_valid_session_name(session: Any) -> bool:
+	return isinstance(session, str) and SESSION_NAME.fullmatch(session) is not None
+
+# Checks the first message of a connection, which must carry the shared secret
+def is_authenticated(message: Any, secret: str) -> bool:
+	if not isinstance(message, dict) or not isinstance(message.get("secret"), str):
+		return False
+	return hmac.compare_digest(message["secret"].encode("utf-8"), secret.encode("utf-8"))
+
+class AgentConnection:
+	"""
+	Persistent connection to one debug agent.
+	Requests and responses are JSON lines matched by id, so requests of many sessions can wait on one connection at once.
+	"""
+	def __init__(self, logger: Logger, address: str):
+		"""
+		:param address: "host:port" of the agent
+		"""
+		self.logger = logger
+		self.address = address
+		self.connection: Optional[socket.socket] = None
+		self.write_lock = Lock()
+		self.pending: dict[int: Event] = {} # Request id -> event receiving the response
+		self.next_id: int = 1
+		self.load: dict[str: float] = {"cpu": 0, "memory": 0, "sessions": 0} # As of the last heartbeat
+		self.last_heartbeat: float = 0
+
+	def connect(self) -> bool:
+		host, port = self.address.rsplit(":", 1)
+		try:
+			connection = socket.create_connection((host, int(port)), timeout=AGENT_REQUEST_TIMEOUT)
+			connection.settimeout(None)
+			send_message(connection, {"secret": AGENT_SECRET or ""})
+		except OSError as e:
+			self.logger.warn("Couldn't connect to agent {}: {}", self.connect, self.address, e)
+			return False
+
+		self.connection = connection
+		eventlet.spawn_n(self.read_responses, connection)
+		self.logger.info("Connected to agent {}", self.connect, self.address)
+		return True
+
+	def read_responses(self, connection: socket.socket) -> None:
+		try:
+			with connection.makefile("r", encoding="utf-8") as f:
+				for line in f:
+					response = json.loads(line)
+					event = self.pending.pop(response["id"], None)
+					if event is not None:
+						event.send(response)
+		except (OSError, ValueError) as e:
+			self.logger.warn("Connection to agent {} broke: {}", self.read_responses, self.address, e)
+		finally:
+			self.disconnected(connection)
+
+	def disconnected(self, connection: socket.socket) -> None:
+		if self.connection is connection:
+			self.connection = None
+		pending, self.pending = self.pending, {}
+		for event in pending.values():
+			event.send({"error": "Agent has disconnected"})
+
+	def is_connected(self) -> bool:
+		return self.connection is not None
+
+	def request(self, method: str, **params: Any) -> dict[str: Any]:
+		"""
+		Sends a request and waits for its response
+		:return: Response with "result" and "state", or with "error"
+		"""
+		if not self.connection and not self.connect():
+			return {"error": "Agent is unavailable"}
+
+		request_id = self.next_id
+		self.next_id += 1
+		event = Event()
+		self.pending[request_id] = event
+
+		try:
+			with self.write_lock:
+				send_message(self.connection, {"id": request_id, "method": method, "params": params})
+		except (OSError, AttributeError) as e: # AttributeError, when connection broke in the meantime
+			self.pending.pop(request_id, None)
+			return {"error": f"Couldn't send request: {e}"}
+
+		try:
+			with eventlet.Timeout(AGENT_REQUEST_TIMEOUT):
+				return event.wait()
+		except eventlet.Timeout:
+			self.pending.pop(request_id, None)
+			return {"error": f"Agent didn't respond in {AGENT_REQUEST_TIMEOUT} seconds"}
+
+	def heartbeat(self) -> None:
+		response = self.request("load")
+		if "error" not in response:
+			self.load = response["result"]
+			self.last_heartbeat = time()
+
+	def is_healthy(self) -> bool:
+		return self.is_connected() and time() - self.last_heartbeat < AGENT_HEARTBEAT_TIMEOUT
+
+	def score(self) -> float:
+		"""
+		The lower, the better place for a new session
+		"""
+		return max(self.load["cpu"], self.load["memory"]) + self.load["sessions"] / AGENT_MAX_SESSIONS
+
+class AgentPool:
+	"""
+	Debug agents of the server, new sessions are placed on the least loaded one
+	"""
+	def __init__(self, logger: Logger, addresses: list[str]):
+		self.logger = logger
+		self.agents = [AgentConnection(logger, address) for address in addresses]
+
+	def watch(self) -> None:
+		"""
+		Sends heartbeats to agents, meant to be run as a background task
+		"""
+		while True:
+			for agent in self.agents:
+				eventlet.spawn_n(agent.heartbeat)
+			eventlet.sleep(AGENT_HEARTBEAT_TIME)
+
+	def least_loaded(self) -> Optional[AgentConnection]:
+		"""
+		:return: Healthy agent with free place and the lowest score, None if there is no such agent
+		"""
+		available = [agent for agent in self.agents if agent.is_healthy() and agent.load["sessions"] < AGENT_MAX_SESSIONS]
+		return min(available, key=lambda agent: agent.score(), default=None)
+
+class RemoteProcess:
+	"""
+	Stands for GDB process running on an agent, so RemoteDebugger can be used in place of GDBDebugger
+	"""
+	def __init__(self, agent: AgentConnection):
+		self.agent = agent
+
+	def isalive(self) -> bool:
+		return self.agent.is_connected()
+
+class RemoteDebugger:
+	"""
+	GDBDebugger running on a debug agent. Has the same interface, calls are sent to the agent
+	"""
+	def __init__(self, logger: Logger, agent: AgentConnection, received_dir: str, input_file_name: str, ip: str) -> None:
+		"""
+		:param input_file_name: Source file in received_dir, it is sent to the agent and removed
+		"""
+		self.logger = logger
+		self.agent = agent
+		self.received_dir = received_dir
+		self.input_file_name = input_file_name
+		self.ip = ip
+
+		self.last_ping_time: int = time()
+		self.lock = FairLock()
+		self.has_been_initialized: bool = False
+		self.is_executing: bool = False
+		self.process: Optional[RemoteProcess] = None
+		self.breakpoints = BreakpointManager(self.input_file_name) # Only breakable_lines are used
+
+	def ping(self) -> None:
+		self.last_ping_time = time()
+
+	def call(self, method: str, *args: Any) -> dict[str: Any]:
+		"""
+		Calls GDBDebugger's method on the agent
+		"""
+		response = self.agent.request("call", session=self.input_file_name, method=method, args=list(args))
+
+		if "error" in response:
+			self.logger.error("Agent {} failed on {}: {}", self.call, self.agent.address, method, response['error'])
+			self.process = None # Session is lost, agent is told to stop it, in case it is still there
+			eventlet.spawn_n(self.agent.request, "call", session=self.input_file_name, method="stop", args=[])
+			return {}
+
+		self.is_executing = response["state"]["is_executing"]
+		if not response["state"]["alive"]:
+			self.process = None
+		return response["result"] or {}
+
+	def init_process(self, input_: str) -> tuple[int, bytes]:
+		path = os.path.join(self.received_dir, self.input_file_name)
+		with open(path, "r") as f:
+			code = f.read()
+		os.remove(path)
+
+		self.agent.load["sessions"] += 1 # Until the next heartbeat, so a burst of sessions doesn't go to one agent
+		response = self.agent.request("create", session=self.input_file_name, code=code, input=input_, ip=self.ip)
+		self.has_been_initialized = True
+
+		if "error" in response:
+			self.logger.alert("Agent {} couldn't start session: {}", self.init_process, self.agent.address, response['error'])
+			return (-2, b"")
+
+		result = response["result"]
+		self.breakpoints.set_breakable_lines(result["breakable_lines"])
+		if response["state"]["alive"]:
+			self.process = RemoteProcess(self.agent)
+		return (result["run_exit_code"], result["stdout"].encode("utf-8"))
+
+	def check_state_after_move(self) -> dict[str: Any]:
+		return self.call("check_state_after_move")
+
+	def poll_execution(self) -> dict[str: Any]:
+		return self.call("poll_execution")
+
+	def step(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None, count: int = 1) -> dict[str: Any]:
+		return self.call("step", add_breakpoints, remove_breakpoints, breakpoints, count)
+
+	def continue_(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> dict[str: Any]:
+		return self.call("continue_", add_breakpoints, remove_breakpoints, breakpoints)
+
+	def finish(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> dict[str: Any]:
+		return self.call("finish", add_breakpoints, remove_breakpoints, breakpoints)
+
+	def pause(self) -> dict[str: Any]:
+		return self.call("pause")
+
+	def resume_state(self) -> dict[str: Any]:
+		return self.call("resume_state")
+
+	def restart(self, code: str, input_: str) -> dict[str: Any]:
+		out = self.call("restart", code, input_)
+		if "breakable_lines" in out:
+			self.breakpoints.set_breakable_lines(out["breakable_lines"])
+		return out
+
+	def stop(self) -> None:
+		if self.process:
+			self.call("stop")
+			self.process = None
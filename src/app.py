@@ -2,44 +2,60 @@
 Server for informejtycy online debugger (https://informejtycy.pl);
 Server is made using Flask with Eventlet and SocketIO technology;
 Should be run with gunicorn on IP 0.0.0.0 (port 5000 is already in use for checker);
+Can be run with several gunicorn eventlet workers (without --preload, WORKERS set to their count). Session is owned by the worker, which started it, other workers forward its events there. Socket.IO messages between workers go through SOCKETIO_MESSAGE_QUEUE or, if it is not set, through unix sockets in SESSIONS_DIR;
 Under the hood, online debugger is GNU GDB with machine interface MI3. To communicate with interactive GDB it uses pexpect module;
 Demo can be found on http://127.0.0.1:5000/debugger.html;
 '''
 
+import eventlet
+eventlet.monkey_patch() # Before anything else is imported, so subprocess, pexpect's select, sleeps and locks yield to other green threads
+
 import os
+import hmac
+import math
 import sys
 import time
-import eventlet
-from threading import Thread, Lock
-from flask import Flask, request
+from flask import Flask, Response, request, jsonify
 from flask_socketio import SocketIO, emit
 from uuid import uuid4
-from typing import Callable, Optional
+from typing import Callable, Optional, Any
 
-from server import IP, PORT, RECEIVED_DIR, DEBUG_DIR, GDB_PRINTERS_DIR, SECRET_KEY, RECEIVE_DEBUG_PING_TIME, CLEANING_UNUSED_DBG_PROCESSES_TIME, DATA_EXTRACTOR_DIR, INIT_DATA_TEMPLATE, MAX_CODE_SIZE
+from server import IP, PORT, RECEIVED_DIR, DEBUG_DIR, GDB_PRINTERS_DIR, SECRET_KEY, DISCONNECT_GRACE_TIME, SESSION_IDLE_TIMEOUT, CLEANING_UNUSED_DBG_PROCESSES_TIME, DATA_EXTRACTOR_DIR, INIT_DATA_TEMPLATE, MAX_CODE_SIZE, RUNNING_PROGRESS_INTERVAL, SESSIONS_DIR, WORKERS, SOCKETIO_MESSAGE_QUEUE, DEBUG_AGENTS, MAX_CONCURRENT_SESSIONS, ADMISSION_MAX_CPU_LOAD, ADMISSION_MAX_MEMORY_USAGE, MAX_QUEUE_LENGTH, QUEUE_POLL_INTERVAL, QUEUE_UPDATE_INTERVAL, ACTION_RATE_LIMIT, ACTION_RATE_BURST, LOG_DISPLAY_LAYER, LOG_BUFFER_SIZE, LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS, STALL_DETECTION, STALL_CHECK_INTERVAL, STALL_THRESHOLD, STALL_MAX_RECORDED, ADMIN_TOKEN, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL, TRACEMALLOC_FRAMES
 from compiler_manager import Compiler
 from gdb_manager import GDBDebugger
-from logger import Logger
+from admission_manager import AdmissionQueue, RateLimiter, host_load
+from agent_manager import AgentPool, RemoteDebugger
+from metrics_manager import metrics, command_seconds, sessions_started
+from profile_manager import Profiler, MemoryTracker
+from session_manager import SessionRegistry
+from stall_manager import StallDetector
+from trace_manager import tracer
+from worker_manager import SessionDirectory, WorkerLink, WorkerMessageQueue
+from logger import Logger, LogWriter
 from flask_cors import CORS
 
 # Flask configuration initialization
 app = Flask(__name__, static_url_path="", static_folder="static/")
 app.config["SECRET_KEY"] = SECRET_KEY
-socketio = SocketIO(app, async_mode="eventlet", cors_allowed_origins="*")
+# Shared by workers, to know which of them owns which session. Without SOCKETIO_MESSAGE_QUEUE it also passes Socket.IO messages between them
+session_directory = SessionDirectory(SESSIONS_DIR)
+if WORKERS <= 1: # Nothing to pass messages to
+	socketio = SocketIO(app, async_mode="eventlet", cors_allowed_origins="*")
+elif SOCKETIO_MESSAGE_QUEUE:
+	socketio = SocketIO(app, async_mode="eventlet", cors_allowed_origins="*", message_queue=SOCKETIO_MESSAGE_QUEUE)
+else:
+	socketio = SocketIO(app, async_mode="eventlet", cors_allowed_origins="*", client_manager=WorkerMessageQueue(session_directory))
 CORS(app)
 
 # To nicely display messages
 sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
 sys.stderr.reconfigure(encoding='utf-8', line_buffering=True)
-logger = Logger(display_logs=True, display_layer=0)
+logger = Logger(display_logs=True, display_layer=LOG_DISPLAY_LAYER, max_logs=LOG_BUFFER_SIZE, writer=LogWriter(LOG_FILE.format(pid=os.getpid()), LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS) if LOG_FILE else None)
 
 # Make sure received directory exists
 os.makedirs(RECEIVED_DIR, exist_ok=True)
 os.makedirs(DEBUG_DIR, exist_ok=True)
 
-# To make sure app.config["debug_processes"] wouldn't be used by two processes in the same time
-debug_processes_lock = Lock()
-
 '''
 ================================================
 |                                              |
@@ -48,6 +64,16 @@ debug_processes_lock = Lock()
 ===============================================|
 '''
 
+# Tells, if a new session can be started now
+def has_capacity_for_session() -> bool:
+	if len(app.config["debug_processes"]) >= MAX_CONCURRENT_SESSIONS:
+		return False
+	if agent_pool.agents: # Agents check their own load
+		return agent_pool.least_loaded() is not None
+
+	load = host_load()
+	return load["cpu"] < ADMISSION_MAX_CPU_LOAD and load["memory"] < ADMISSION_MAX_MEMORY_USAGE
+
 # Creates a .cpp source code file for debugging
 def make_cpp_file_for_debugger(code: str) -> tuple[str, str]:
 	auth = str(uuid4())
@@ -56,34 +82,35 @@ def make_cpp_file_for_debugger(code: str) -> tuple[str, str]:
 		f.write(code)
 	return file_name, auth
 
-# Cleans debug processes from app.config["debug_processes"], if they wasn't pinged for a long time
+# Cleans debug processes from app.config["debug_processes"], if their client has left or they weren't used for a long time
 def clean_unused_debug_processes() -> None:
 	while True:
 		eventlet.sleep(CLEANING_UNUSED_DBG_PROCESSES_TIME)
-		with debug_processes_lock:
-			for auth in dict(app.config["debug_processes"]): # dict(...) to make copy
-				if not app.config["debug_processes"][auth].has_been_initialized: # when debug process container is still building
-					app.config["debug_processes"][auth].ping()
-
-				elif (time.time() - app.config["debug_processes"][auth].last_ping_time >= RECEIVE_DEBUG_PING_TIME	# Not pinged for long enough
-						or not app.config["debug_processes"][auth].process											# Debug class was stopped, but not cleaned
-						or not app.config["debug_processes"][auth].process.isalive()):								# Process was stopped, but debug class was not stopped
-					logger.spam(f"GDBDebugger with '{auth}' wasn't pinged for {RECEIVE_DEBUG_PING_TIME} seconds. Cleaning...", clean_unused_debug_processes)
-
-					app.config["debug_processes"][auth].stop()
-					del app.config["debug_processes"][auth]
-					
-					logger.spam(f"Cleaned successfully!", clean_unused_debug_processes)
-
-def check_if_process_alive(authorization: str) -> bool:
-	if not authorization in app.config["debug_processes"]:
-		return False
+		now = time.time()
+		for auth, debugger in app.config["debug_processes"].due(now): # Only sessions, whose deadline has come
+			if not debugger.has_been_initialized: # when debug process container is still building
+				debugger.ping()
+				app.config["debug_processes"].schedule(auth)
+				continue
+
+			if not debugger.lock.acquire(blocking=False): # Session is busy with a command, so it is checked next time
+				app.config["debug_processes"].schedule(auth, now + CLEANING_UNUSED_DBG_PROCESSES_TIME)
+				continue
+			try:
+				if (app.config["debug_processes"].is_expired(auth, now)	# Client has disconnected (and not come back) or was idle for too long
+						or not debugger.process							# Debug class was stopped, but not cleaned
+						or not debugger.process.isalive()):				# Process was stopped, but debug class was not stopped
+					logger.spam("GDBDebugger with '{}' is no longer used. Cleaning...", clean_unused_debug_processes, auth)
+					tracer.attach(auth) # Stop is recorded in the session's trace
 
-	if not app.config["debug_processes"][authorization].process:
-		del app.config["debug_processes"][authorization]
-		return False
-	
-	return True
+					app.config["debug_processes"].remove(auth, debugger)
+					debugger.stop()
+
+					logger.spam("Cleaned successfully!", clean_unused_debug_processes)
+				else:
+					app.config["debug_processes"].schedule(auth)
+			finally:
+				debugger.lock.release()
 
 '''
 ================================================
@@ -103,16 +130,44 @@ with app.app_context():
 	
 	logger.info("Starting cleaning process", main)
 
-	lt = Thread(target=clean_unused_debug_processes)
-	lt.start()
+	socketio.start_background_task(clean_unused_debug_processes)
+
+	logger.info("Cleaning process has started", main)
+
+	# For /admin endpoints
+	profiler = Profiler(PROFILE_SAMPLE_INTERVAL)
+	memory_tracker = MemoryTracker(TRACEMALLOC_FRAMES)
+
+	# Finds blocking calls, which stop all sessions of this worker
+	stall_detector = StallDetector(logger, STALL_CHECK_INTERVAL, STALL_THRESHOLD, STALL_MAX_RECORDED)
+	if STALL_DETECTION:
+		stall_detector.start()
+		logger.info("Stall detection has started (threshold {}s)", main, STALL_THRESHOLD)
+
+	forwarded_sessions: dict[str: tuple[int, str]] = {} # sid -> (owner worker, authorization) of clients, whose events are forwarded
+	worker_link = WorkerLink(logger, session_directory, lambda event, data, sid: handle_forwarded_event(event, data, sid))
+	socketio.start_background_task(worker_link.serve)
+
+	logger.info("Worker {} accepts forwarded events", main, session_directory.worker_id)
 
-	logger.info(f"Cleaning process has started", main)
+	# Sessions run on debug agents, if there are any
+	agent_pool = AgentPool(logger, DEBUG_AGENTS)
+	if agent_pool.agents:
+		socketio.start_background_task(agent_pool.watch)
+		logger.info("Sessions will run on agents: {}", main, ', '.join(DEBUG_AGENTS))
 
 	# For debugging
 	# Server use it to indentify debugging processes
-	app.config["debug_processes"]: dict[str: GDBDebugger] = {} # type: ignore
+	app.config["debug_processes"]: SessionRegistry = SessionRegistry(SESSION_IDLE_TIMEOUT, DISCONNECT_GRACE_TIME, session_directory) # type: ignore
 
-	logger.info(f"Server is running on {IP}:{PORT}", main)
+	# Requests waiting for capacity to start a session
+	admission_queue = AdmissionQueue(has_capacity_for_session, MAX_QUEUE_LENGTH)
+	action_limiter = RateLimiter(ACTION_RATE_LIMIT, ACTION_RATE_BURST)
+
+	metrics.gauge("debugger_active_sessions", "Sessions registered in this worker", lambda: len(app.config["debug_processes"]))
+	metrics.gauge("debugger_queued_requests", "start_debugging requests waiting for capacity", lambda: len(admission_queue.queue))
+
+	logger.info("Server is running on {}:{}", main, IP, PORT)
 
 '''
 ================================================
@@ -122,15 +177,90 @@ with app.app_context():
 ===============================================|
 '''
 
+# Metrics of this worker in Prometheus text format
+@app.route("/metrics")
+def handle_metrics() -> Response:
+	return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# Trace of a session in Chrome trace event format (chrome://tracing, Perfetto). Only sampled sessions have one, it is kept by the worker owning the session
+@app.route("/trace/<authorization>")
+def handle_trace(authorization: str) -> Response:
+	trace = tracer.export(authorization)
+	if trace is None:
+		return Response("Session isn't traced", status=404)
+	return jsonify(trace)
+
+# Tells, if request has the admin token. Admin endpoints are disabled, if no token is set
+def is_admin() -> bool:
+	token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+	return ADMIN_TOKEN is not None and hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+# Profiles this worker for ?seconds= (while it keeps serving). ?mode=sampling (default) returns collapsed stacks for flamegraphs, ?mode=deterministic returns cProfile report
+@app.route("/admin/profile")
+def handle_profile() -> Response:
+	if not is_admin():
+		return Response("Unauthorized", status=401)
+
+	try:
+		seconds = float(request.args.get("seconds", 10))
+	except ValueError:
+		return Response("Invalid seconds", status=400)
+	if not math.isfinite(seconds) or seconds <= 0: # min() would keep nan, and inf or negative sleeps break the profiler
+		return Response("Invalid seconds", status=400)
+	seconds = min(seconds, PROFILE_MAX_SECONDS)
+	mode = request.args.get("mode", "sampling")
+	if mode not in ("sampling", "deterministic"):
+		return Response("Invalid mode", status=400)
+
+	logger.info("Profiling ({}) for {} seconds", handle_profile, mode, seconds)
+	profile = profiler.profile(seconds, mode)
+	if profile is None:
+		return Response("Profile is already being taken", status=409)
+	return Response(profile, mimetype="text/plain")
+
+# Growth of memory allocations since the previous call, grouped by ?group_by=lineno (default), filename or traceback. The first call starts tracing, ?stop=1 stops it
+@app.route("/admin/memory")
+def handle_memory() -> Response:
+	if not is_admin():
+		return Response("Unauthorized", status=401)
+
+	if request.args.get("stop"):
+		memory_tracker.stop()
+		return Response("Tracing has stopped\n", mimetype="text/plain")
+
+	group_by = request.args.get("group_by", "lineno")
+	if group_by not in ("lineno", "filename", "traceback"):
+		return Response("Invalid group_by", status=400)
+	try:
+		limit = int(request.args.get("limit", 30))
+	except ValueError:
+		return Response("Invalid limit", status=400)
+
+	return Response(memory_tracker.diff(limit, group_by), mimetype="text/plain")
+
 # Captures websocket connection for debugging.
 @socketio.on('connect')
 def handle_connect() -> None:
-	logger.info(f"Client connected: {request.sid}", handle_connect)
+	logger.info("Client connected: {}", handle_connect, request.sid)
 
 # Captures websocket disconnection.
 @socketio.on('disconnect')
 def handle_disconnect() -> None:
-	logger.info(f"Client disconnected: {request.sid}", handle_disconnect)
+	admission_queue.cancel_sid(request.sid)
+	logger.info("Client disconnected: {}", handle_disconnect, request.sid)
+	handle_detaching({}, request.sid)
+
+	# Session of this client is owned by another worker
+	if request.sid in forwarded_sessions:
+		owner, authorization = forwarded_sessions.pop(request.sid)
+		worker_link.forward(owner, "detach", {"authorization": authorization}, request.sid)
+
+# Starts grace time of disconnected client's session. After it the session is stopped, unless the client comes back
+def handle_detaching(data: dict[str: str], sid: str) -> None:
+	authorization = app.config["debug_processes"].unbind_sid(sid, time.time())
+	if authorization:
+		tracer.attach(authorization)
+		logger.debug("Session '{}' will be stopped in {} seconds, unless its client comes back", handle_detaching, authorization, DISCONNECT_GRACE_TIME)
 
 # Captures websocket debugging request.
 @socketio.on('start_debugging')
@@ -143,125 +273,382 @@ def handle_debugging(data: dict[str: str]) -> None:
 		return
 	
 	client_ip = request.access_route[0] if request.access_route else request.remote_addr
-	with debug_processes_lock:
-		for dbg in app.config["debug_processes"]:
-			if app.config["debug_processes"][dbg].ip == client_ip:
-				emit("started_debugging", {"status": "There is already registered debug process on your IP. If you belive this is a mistake or have just closed debug process, please try again after 30 seconds"})
-				return
+	if app.config["debug_processes"].has_ip(client_ip):
+		emit("started_debugging", {"status": "There is already registered debug process on your IP. If you belive this is a mistake or have just closed debug process, please try again after 30 seconds"})
+		return
+	if not wait_for_admission(client_ip):
+		return
 
-	logger.debug(f"Client requested debugging: {request.sid}", handle_debugging)
-	logger.debug(f"Data: {data}", handle_debugging)
+	agent = None
+	if agent_pool.agents:
+		agent = agent_pool.least_loaded()
+		if agent is None:
+			emit("started_debugging", {"status": "All debugging servers are busy, please try again later."})
+			return
 
 	file_name, auth = make_cpp_file_for_debugger(data["code"])
+	if agent:
+		debugger_class = RemoteDebugger(logger, agent, RECEIVED_DIR, file_name, client_ip)
+	else:
+		debugger_class = GDBDebugger(logger, compiler, DEBUG_DIR, GDB_PRINTERS_DIR, DATA_EXTRACTOR_DIR, file_name, client_ip)
+
+	# Session lock is taken before registering, so actions sent during the initialization wait for it
+	with debugger_class.lock:
+		if not app.config["debug_processes"].add(auth, debugger_class):
+			os.remove(os.path.join(RECEIVED_DIR, file_name))
+			emit("started_debugging", {"status": "There is already registered debug process on your IP. If you belive this is a mistake or have just closed debug process, please try again after 30 seconds"})
+			return
+		app.config["debug_processes"].bind_sid(auth, request.sid)
+
+		logger.debug("Client requested debugging: {}", handle_debugging, request.sid)
+		logger.debug("Data: {}", handle_debugging, data)
+
+		tracer.begin(auth)
+		with tracer.span("start_debugging"):
+			initialize_debugging(debugger_class, auth, data["input"])
+
+		if not debugger_class.process: # Compilation or build error, or program has already ended. IP is freed for a new session right away
+			app.config["debug_processes"].remove(auth, debugger_class)
+			debugger_class.stop()
+
+# Waits in the admission queue, until a new session can be started. Sends "queue_position" meanwhile
+# Returns False, if the request was rejected or client has left
+def wait_for_admission(client_ip: str) -> bool:
+	ticket, reason = admission_queue.enter(client_ip, request.sid)
+	if ticket is None:
+		emit("started_debugging", {"status": reason})
+		logger.spam("Emitted \"started_debugging\" (rejected by admission) to {}", wait_for_admission, request.sid)
+		return False
 
-	debugger_class = GDBDebugger(logger, compiler, DEBUG_DIR, GDB_PRINTERS_DIR, DATA_EXTRACTOR_DIR, file_name, client_ip)
-	app.config["debug_processes"][auth] = debugger_class
-	run_exit_code, stdout = debugger_class.init_process(data["input"])
+	last_update = 0
+	while not admission_queue.try_admit(ticket):
+		if ticket.cancelled:
+			return False
+		if time.time() - last_update >= QUEUE_UPDATE_INTERVAL:
+			last_update = time.time()
+			emit("queue_position", admission_queue.position(ticket))
+			logger.spam("Emitted \"queue_position\" to {}", wait_for_admission, request.sid)
+		socketio.sleep(QUEUE_POLL_INTERVAL)
+	return True
+
+# Compiles and runs the program of a registered session, sends the result to the client. Called with the session's lock held
+def initialize_debugging(debugger_class: GDBDebugger | RemoteDebugger, auth: str, input_: str) -> None:
+	run_exit_code, stdout = debugger_class.init_process(input_)
 
 	data_to_be_sent: dict[str: str | bool] = dict(INIT_DATA_TEMPLATE)
 
+	sessions_started.inc({-1: "compilation_error", -2: "build_error"}.get(run_exit_code, "ok"))
+
 	if run_exit_code == -1:
 		data_to_be_sent["compilation_error"] = True
 		data_to_be_sent["compilation_error_details"] = stdout.decode("utf-8")
 		emit("started_debugging", data_to_be_sent)
-		logger.spam(f"Emitted \"start_debugging\" (with compilation_error) to {request.sid}", handle_debugging)
+		logger.spam("Emitted \"start_debugging\" (with compilation_error) to {}", initialize_debugging, request.sid)
 	elif run_exit_code == -2:
 		emit("started_debugging", {"status": "Server couldn't build your program!\nCommon reason: compiled file was too big!\nIf you belive this is a mistake, please send your code to us (kontakt@informejtycy.pl)"})
-		logger.spam(f"Emitted \"started_debugging\" (not ok status) to {request.sid}", handle_debugging)
+		logger.spam("Emitted \"started_debugging\" (not ok status) to {}", initialize_debugging, request.sid)
 	else:
 		data_to_be_sent["authorization"] = auth
+		data_to_be_sent["breakable_lines"] = debugger_class.breakpoints.breakable_lines
 		emit("started_debugging", data_to_be_sent)
-		logger.spam(f"Emitted \"start_debugging\" to {request.sid}", handle_debugging)
+		logger.spam("Emitted \"start_debugging\" to {}", initialize_debugging, request.sid)
 	
 		debug_data = debugger_class.check_state_after_move()
 		debug_data["status"] = "ok"
+		emit_program_output(debug_data, request.sid)
 		emit("debug_data", debug_data)
-		logger.spam(f"Emitted \"debug_data\" to {request.sid}", handle_debugging)
+		logger.spam("Emitted \"debug_data\" to {}", initialize_debugging, request.sid)
+
+# Sends new output of debugged program as a separate event
+def emit_program_output(debug_data: dict[str: Any], sid: str) -> None:
+	if debug_data.get("stdout") or debug_data.get("stdout_truncated"):
+		socketio.emit("program_output", {"output": debug_data["stdout"], "truncated": debug_data["stdout_truncated"]}, to=sid)
+
+# Watches program left running by step/continue/finish. Sends "still_running" until it stops, then "debug_data"
+# Messages go to the session's current sid, so a client which has reattached meanwhile gets them
+def watch_execution(authorization: str, sid: str) -> None:
+	while True:
+		socketio.sleep(RUNNING_PROGRESS_INTERVAL)
+
+		tracer.attach(authorization)
+		with app.config["debug_processes"].session(authorization) as debugger:
+			if not debugger:
+				return
+			output = debugger.poll_execution()
+		sid = app.config["debug_processes"].sid_of(authorization) or sid
+
+		output["status"] = "ok"
+		emit_program_output(output, sid)
+
+		if output["is_executing"]:
+			socketio.emit("still_running", output, to=sid)
+			logger.spam("Emitted \"still_running\" to {}", watch_execution, sid)
+		else:
+			socketio.emit("debug_data", output, to=sid)
+			logger.spam("Emitted \"debug_data\" to {}", watch_execution, sid)
+			return
+
+# Forwards session event to the worker owning the session (when run with several gunicorn workers)
+# Returns True, if the event was forwarded, so it shouldn't be handled here
+def forwarded_to_owner(event: str, data: dict[str: str]) -> bool:
+	if type(data) != dict or not "authorization" in data: # Invalid, then rejected by the handler
+		return False
+
+	owner = session_directory.owner(data["authorization"])
+	if owner is None or owner == session_directory.worker_id:
+		return False
+
+	if not worker_link.forward(owner, event, data, request.sid):
+		emit("debug_data", {"status": "invalid authorization (or process might have been stopped)"})
+	forwarded_sessions[request.sid] = (owner, data["authorization"])
+	logger.spam("Forwarded \"{}\" from {} to worker {}", forwarded_to_owner, event, request.sid, owner)
+	return True
+
+# Handles session event forwarded by another worker
+def handle_forwarded_event(event: str, data: dict[str: str], sid: str) -> None:
+	with app.app_context():
+		SESSION_EVENT_HANDLERS[event](data, sid)
+
+# Actions, which aren't rate limited, so a throttled client can still interrupt a runaway program
+UNLIMITED_ACTIONS: set[str] = {"pause", "stop"}
 
 # Base for debugger actions handling functions
-def debugger_action(what_client_did: str, method_name: str, from_: Callable[[dict[str: str]], None], data: dict[str: str], is_expecting_breakpoints: bool = True) -> None:
+def debugger_action(what_client_did: str, method_name: str, from_: Callable[[dict[str: str]], None], data: dict[str: str], sid: str, is_expecting_breakpoints: bool = True, response_event: str = "debug_data") -> None:
 	if not "authorization" in data:
-		emit("debug_data", {"status": "No authorization in request!"})
+		socketio.emit("debug_data", {"status": "No authorization in request!"}, to=sid)
 		return
 
+	authorization = data["authorization"]
+	tracer.attach(authorization)
+
 	if is_expecting_breakpoints:
-		if not "add_breakpoints" in data or not "remove_breakpoints" in data: emit("No breakpoints changes in request!"); return
-		if type(data["add_breakpoints"]) != list or type(data["add_breakpoints"]) != list: emit("Invalid breakpoints add/remove type!"); return
-		
-		for bpi in range(len(data["add_breakpoints"])): 
-			try:
-				data["add_breakpoints"][bpi] = int(data["add_breakpoints"][bpi])
-			except:
-				emit("debug_data", {"status": "Breakpoints changes should be integers!"})
+		# Client sends either changes ("add_breakpoints" and "remove_breakpoints") or whole state ("breakpoints")
+		data.setdefault("add_breakpoints", [])
+		data.setdefault("remove_breakpoints", [])
+		data.setdefault("breakpoints", None)
+
+		for key in ["add_breakpoints", "remove_breakpoints", "breakpoints"]:
+			if data[key] is None:
+				continue
+			if type(data[key]) != list:
+				socketio.emit("debug_data", {"status": "Invalid breakpoints add/remove type!"}, to=sid)
 				return
-		
-		for bpi in range(len(data["remove_breakpoints"])):
 			try:
-				data["remove_breakpoints"][bpi] = int(data["remove_breakpoints"][bpi])
+				data[key] = [int(bp) for bp in data[key]]
 			except:
-				emit("debug_data", {"status": "Breakpoints changes should be integers!"})
+				socketio.emit("debug_data", {"status": "Breakpoints changes should be integers!"}, to=sid)
 				return
 
-	authorization = data["authorization"]
-	logger.spam(f"Client {what_client_did}, with authorization: {authorization}", from_)
+	if method_name not in UNLIMITED_ACTIONS and not action_limiter.allow(sid):
+		socketio.emit("debug_data", {"status": "Too many requests, slow down."}, to=sid)
+		return
+
+	logger.spam("Client {}, with authorization: {}", from_, what_client_did, authorization)
 
-	with debug_processes_lock:
-		if not check_if_process_alive(authorization):
-			emit("debug_data", {"status": "invalid authorization (or process might have been stopped)"})
-			logger.spam(f"Emitted \"debug_data\" (with invalid authorization) to {request.sid}", from_)
+	# Steps without breakpoint changes, which pile up while the session is busy, are executed as one "step N"
+	# Only adjacent steps are merged, any other action ends the run, so actions are never reordered
+	coalesce_steps = method_name == "step" and not data["add_breakpoints"] and not data["remove_breakpoints"] and data["breakpoints"] is None
+	if coalesce_steps:
+		run = app.config["debug_processes"].queue_step(authorization)
+	else:
+		app.config["debug_processes"].queue_action(authorization)
+
+	with app.config["debug_processes"].session(authorization) as debugger:
+		steps = app.config["debug_processes"].take_steps(authorization, run) if coalesce_steps and debugger else 1
+		if not debugger:
+			socketio.emit("debug_data", {"status": "invalid authorization (or process might have been stopped)"}, to=sid)
+			logger.spam("Emitted \"debug_data\" (with invalid authorization) to {}", from_, sid)
+		elif is_expecting_breakpoints and debugger.is_executing:
+			socketio.emit("debug_data", {"status": "Program is still running, pause it first."}, to=sid)
+			logger.spam("Emitted \"debug_data\" (program is running) to {}", from_, sid)
+		elif steps == 0:
+			logger.spam("Step of {} was executed together with an earlier one, no response", from_, sid)
 		else:
-			method = getattr(app.config["debug_processes"][authorization], method_name)
+			debugger.ping() # Every action counts as activity
+			app.config["debug_processes"].bind_sid(authorization, sid)
+			method = getattr(debugger, method_name)
 			output: Optional[str] = None
 
-			if is_expecting_breakpoints: output = method(data["add_breakpoints"], data["remove_breakpoints"])
-			else: output = method()
+			with command_seconds.time(method_name), tracer.span(method_name):
+				if steps > 1: output = method(data["add_breakpoints"], data["remove_breakpoints"], data["breakpoints"], count=steps)
+				elif is_expecting_breakpoints: output = method(data["add_breakpoints"], data["remove_breakpoints"], data["breakpoints"])
+				else: output = method()
 
 			if not output:
 				output = {}
 			output["status"] = "ok"
 
-			emit("debug_data", output)
-			logger.spam(f"Emitted \"debug_data\" to {request.sid}", from_)
+			emit_program_output(output, sid)
+
+			if is_expecting_breakpoints and output.get("is_executing"):
+				socketio.emit("still_running", output, to=sid)
+				socketio.start_background_task(watch_execution, authorization, sid)
+				logger.spam("Emitted \"still_running\" to {}", from_, sid)
+			else:
+				socketio.emit(response_event, output, to=sid)
+				logger.spam("Emitted \"{}\" to {}", from_, response_event, sid)
 
-# Captures debug class ping. Used to keep debug class alive
+# Captures debug class ping. Not needed since session lives as long as its client is connected, kept for older clients
 @socketio.on('ping')
 def handle_debug_ping(data: dict[str: str]) -> None:
+	if forwarded_to_owner("ping", data): return
+	debug_ping(data, request.sid)
+
+# Pings the session for client sid. Also called for events forwarded by other workers, so sid isn't taken from request
+def debug_ping(data: dict[str: str], sid: str) -> None:
 	if not "authorization" in data:
-		emit("debug_data", {"status": "No authorization in request!"})
+		socketio.emit("debug_data", {"status": "No authorization in request!"}, to=sid)
 		return
 
 	authorization = data["authorization"]
-	logger.spam(f"Client pinged debugger class, with authorization: {authorization}", handle_debug_ping)
+	logger.spam("Client pinged debugger class, with authorization: {}", debug_ping, authorization)
+	tracer.attach(authorization)
+
+	# Pinging doesn't use GDB, so it doesn't wait for the session's lock
+	debugger = app.config["debug_processes"].get(authorization)
+	if not debugger or (debugger.has_been_initialized and not debugger.process):
+		socketio.emit("debug_data", {"status": "invalid authorization (or process might have been stopped)"}, to=sid)
+		logger.spam("Emitted \"debug_data\" (with invalid authorization) to {}", debug_ping, sid)
+	else:
+		debugger.ping()
+		app.config["debug_processes"].bind_sid(authorization, sid)
+
+		socketio.emit("pong", {"status": "ok"}, to=sid)
+		logger.spam("Emitted \"pong\" to {}", debug_ping, sid)
+
+# Captures reattaching to a running session, e.g. after reconnect (client has a new sid). Sends whole current state of the session
+@socketio.on("resume_debugging")
+def handle_resuming(data: dict[str: str]) -> None:
+	if forwarded_to_owner("resume_debugging", data): return
+	resume_debugging(data, request.sid)
+
+# Reattaches client sid to the session. Also called for events forwarded by other workers, so sid isn't taken from request
+def resume_debugging(data: dict[str: str], sid: str) -> None:
+	if type(data) != dict or not "authorization" in data:
+		socketio.emit("resumed_debugging", {"status": "No authorization in request!"}, to=sid)
+		return
 
-	with debug_processes_lock:
-		if not check_if_process_alive(authorization):
-			emit("debug_data", {"status": "invalid authorization (or process might have been stopped)"})
-			logger.spam(f"Emitted \"debug_data\" (with invalid authorization) to {request.sid}", handle_debug_ping)
-		else:
-			app.config["debug_processes"][authorization].ping()
+	authorization = data["authorization"]
+	logger.spam("Client requested resuming, with authorization: {}", resume_debugging, authorization)
+	tracer.attach(authorization)
+
+	with app.config["debug_processes"].session(authorization) as debugger:
+		if not debugger:
+			socketio.emit("resumed_debugging", {"status": "invalid authorization (or process might have been stopped)"}, to=sid)
+			logger.spam("Emitted \"resumed_debugging\" (with invalid authorization) to {}", resume_debugging, sid)
+			return
+
+		debugger.ping()
+		app.config["debug_processes"].bind_sid(authorization, sid)
+		state = debugger.resume_state()
+
+	state["status"] = "ok"
+	socketio.emit("resumed_debugging", {"status": "ok", "authorization": authorization, "breakable_lines": state["breakable_lines"], "output": state["stdout"], "truncated": state["stdout_truncated"]}, to=sid)
+	socketio.emit("still_running" if state["is_executing"] else "debug_data", state, to=sid)
+	logger.spam("Emitted \"resumed_debugging\" to {}", resume_debugging, sid)
+
+# Captures restart of a running session with new code and/or input. Container and GDB are reused, breakpoints are kept
+@socketio.on("restart_debugging")
+def handle_restarting(data: dict[str: str]) -> None:
+	if forwarded_to_owner("restart_debugging", data): return
+	restart_debugging(data, request.sid)
+
+# Restarts the session for client sid. Also called for events forwarded by other workers, so sid isn't taken from request
+def restart_debugging(data: dict[str: str], sid: str) -> None:
+	if type(data) != dict or not "authorization" in data or not "code" in data or not "input" in data:
+		socketio.emit("restarted_debugging", {"status": "No authorization, code and/or input in request."}, to=sid)
+		return
+	elif len(data["code"]) > MAX_CODE_SIZE:
+		socketio.emit("restarted_debugging", {"status": "Requested code is too big (max_bytes=5500)."}, to=sid)
+		return
+	elif not action_limiter.allow(sid):
+		socketio.emit("restarted_debugging", {"status": "Too many requests, slow down."}, to=sid)
+		return
 
-			emit("pong", {"status": "ok"})
-			logger.spam(f"Emitted \"pong\" to {request.sid}", handle_debug_ping)
+	authorization = data["authorization"]
+	logger.spam("Client requested restarting, with authorization: {}", restart_debugging, authorization)
+	tracer.attach(authorization)
+	app.config["debug_processes"].queue_action(authorization)
+
+	with app.config["debug_processes"].session(authorization) as debugger:
+		if not debugger:
+			socketio.emit("restarted_debugging", {"status": "invalid authorization (or process might have been stopped)"}, to=sid)
+			logger.spam("Emitted \"restarted_debugging\" (with invalid authorization) to {}", restart_debugging, sid)
+			return
+
+		debugger.ping()
+		app.config["debug_processes"].bind_sid(authorization, sid)
+		output = debugger.restart(data["code"], data["input"])
+
+	if output.get("compilation_error"):
+		socketio.emit("restarted_debugging", {"status": "ok", "compilation_error": True, "compilation_error_details": output["compilation_error_details"]}, to=sid)
+		logger.spam("Emitted \"restarted_debugging\" (with compilation_error) to {}", restart_debugging, sid)
+		return
+
+	output["status"] = "ok"
+	socketio.emit("restarted_debugging", {"status": "ok", "compilation_error": False, "breakable_lines": output.get("breakable_lines", [])}, to=sid)
+	emit_program_output(output, sid)
+	socketio.emit("debug_data", output, to=sid)
+	logger.spam("Emitted \"restarted_debugging\" to {}", restart_debugging, sid)
 
 # Captures continuing execution
 @socketio.on("continue")
 def handle_continuing(data: dict[str: str]) -> None:
-	debugger_action("requested continuing debugged code", "continue_", handle_continuing, data)
+	if forwarded_to_owner("continue", data): return
+	continue_debugging(data, request.sid)
+
+def continue_debugging(data: dict[str: str], sid: str) -> None:
+	debugger_action("requested continuing debugged code", "continue_", continue_debugging, data, sid)
 
 # Captures stepping in debugged code
 @socketio.on("step")
 def handle_stepping(data: dict[str: str]) -> None:
-	debugger_action("requested stepping", "step", handle_stepping, data)
+	if forwarded_to_owner("step", data): return
+	step_debugging(data, request.sid)
+
+def step_debugging(data: dict[str: str], sid: str) -> None:
+	debugger_action("requested stepping", "step", step_debugging, data, sid)
 
 # Captures finishing debugged function
 @socketio.on("finish")
 def handle_finishing(data: dict[str: str]) -> None:
-	debugger_action("requested finishing", "finish", handle_finishing, data)
+	if forwarded_to_owner("finish", data): return
+	finish_debugging(data, request.sid)
+
+def finish_debugging(data: dict[str: str], sid: str) -> None:
+	debugger_action("requested finishing", "finish", finish_debugging, data, sid)
+
+# Captures pausing of running debugged code. New state is sent as "debug_data", when program stops
+@socketio.on("pause")
+def handle_pausing(data: dict[str: str]) -> None:
+	if forwarded_to_owner("pause", data): return
+	pause_debugging(data, request.sid)
+
+def pause_debugging(data: dict[str: str], sid: str) -> None:
+	debugger_action("requested pausing", "pause", pause_debugging, data, sid, is_expecting_breakpoints=False, response_event="pause_requested")
 
 # Captures debugging stop
 @socketio.on("stop")
 def handle_stopping(data: dict[str: str]) -> None:
-	debugger_action("requested stopping", "stop", handle_stopping, data, is_expecting_breakpoints=False)
+	if forwarded_to_owner("stop", data): return
+	stop_debugging(data, request.sid)
+
+def stop_debugging(data: dict[str: str], sid: str) -> None:
+	debugger_action("requested stopping", "stop", stop_debugging, data, sid, is_expecting_breakpoints=False)
+
+# Events acting on an existing session, which are handled by the worker owning it
+# Handlers take sid of the client explicitly, Socket.IO handlers (handle_*) pass request.sid, so clients can't act as another sid
+SESSION_EVENT_HANDLERS: dict[str: Callable[[dict[str: str], str], None]] = {
+	"ping": debug_ping,
+	"continue": continue_debugging,
+	"step": step_debugging,
+	"finish": finish_debugging,
+	"pause": pause_debugging,
+	"stop": stop_debugging,
+	"detach": handle_detaching,
+	"resume_debugging": resume_debugging,
+	"restart_debugging": restart_debugging,
+}
 
 '''
 ================================================
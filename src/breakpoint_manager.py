@@ -0,0 +1,88 @@
+from bisect import bisect_left
+from typing import Any, Optional
+
+class BreakpointManager:
+	"""
+	Breakpoints of one debugging session, keyed by line
+	"""
+	def __init__(self, source_file_name: str):
+		"""
+		:param source_file_name: Name of debugged source file, used in GDB locations
+		"""
+		self.source_file_name = source_file_name
+		self.numbers: dict[int: int] = {} # line -> GDB breakpoint number
+		self.rejected: set[int] = set() # Lines, where GDB couldn't set a breakpoint
+		self.breakable_lines: list[int] = [] # Sorted lines with code, empty if unknown (then every line is tried)
+		self.moved: dict[int: int] = {} # Requested line -> line with code, where the breakpoint was moved during the last request
+
+	def lines(self) -> list[int]:
+		return sorted(self.numbers)
+
+	def set_breakable_lines(self, lines: list[int]) -> None:
+		self.breakable_lines = sorted(lines)
+
+	def snap(self, line: int) -> Optional[int]:
+		"""
+		:return: The first line with code at or after line, None if there is no such line
+		"""
+		if not self.breakable_lines:
+			return line
+		i = bisect_left(self.breakable_lines, line)
+		return self.breakable_lines[i] if i < len(self.breakable_lines) else None
+
+	def snap_all(self, lines: list[int]) -> set[int]:
+		"""
+		Snaps lines to lines with code. Lines after the last line with code are rejected
+		"""
+		snapped = set()
+		for line in lines:
+			target = self.snap(line)
+			if target is None:
+				self.rejected.add(line)
+				continue
+			if target != line:
+				self.moved[line] = target
+			snapped.add(target)
+		return snapped
+
+	def requested_lines(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> set[int]:
+		"""
+		Turns client's request into the set of lines, which should have breakpoints
+		:param breakpoints: Whole requested state. If given, add_breakpoints and remove_breakpoints are ignored
+		"""
+		self.moved = {}
+		if breakpoints is not None:
+			return self.snap_all(breakpoints)
+		return (set(self.numbers) | self.snap_all(add_breakpoints)) - {self.snap(line) for line in remove_breakpoints}
+
+	def diff(self, requested: set[int]) -> tuple[list[int], list[int]]:
+		"""
+		:return: Lines to insert breakpoints on and GDB numbers of breakpoints to delete
+		"""
+		to_insert = sorted(requested - set(self.numbers) - self.rejected) # GDB rejected lines are not retried
+		to_delete = [self.numbers[line] for line in sorted(set(self.numbers) - requested)]
+		return (to_insert, to_delete)
+
+	def commands(self, to_insert: list[int], to_delete: list[int]) -> list[str]:
+		"""
+		MI commands applying the diff. Deletion is one command, every insertion is a separate one
+		"""
+		commands = [f"-break-insert {self.source_file_name}:{line}" for line in to_insert]
+		if to_delete:
+			commands.append("-break-delete " + " ".join(str(number) for number in to_delete))
+		return commands
+
+	def apply(self, to_insert: list[int], to_delete: list[int], responses: list[Optional[dict[str, Any]]]) -> None:
+		"""
+		Updates the table from GDB responses to commands(to_insert, to_delete), in the same order
+		"""
+		for line, response in zip(to_insert, responses):
+			if response and response["message"] == "done" and "bkpt" in (response["payload"] or {}):
+				self.numbers[line] = int(response["payload"]["bkpt"]["number"])
+				self.rejected.discard(line)
+			else:
+				self.rejected.add(line)
+
+		if to_delete and len(responses) > len(to_insert) and responses[-1] and responses[-1]["message"] == "done":
+			deleted = set(to_delete)
+			self.numbers = {line: number for line, number in self.numbers.items() if number not in deleted}
@@ -1,9 +1,12 @@
 import os
+import json
 import subprocess
 from os.path import join
 
 from logger import Logger
-from server import MAX_COMPILATION_ERROR_MESSAGE_LENGTH, COMPILATION_TIMEOUT
+from metrics_manager import compile_seconds
+from trace_manager import traced
+from server import MAX_COMPILATION_ERROR_MESSAGE_LENGTH, COMPILATION_TIMEOUT, LINE_TABLE_TIMEOUT
 
 '''
 This function shortens compilation errors (C++ standard library errors suck)
@@ -37,6 +40,7 @@ class Compiler:
 		self.input_dir = input_dir
 		self.debug_output_dir = debug_output_dir
 
+	@traced("compile")
 	def compile(self, filename: str) -> tuple[str, bytes]:
 		"""
 		Compile a file
@@ -49,12 +53,54 @@ class Compiler:
 
 		stdout = bytes()
 
+		with compile_seconds.time("timeout") as timer:
+			try:
+				result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=COMPILATION_TIMEOUT)
+				stdout = shorten_bytes(result.stderr)
+				timer.label_values = ("ok" if result.returncode == 0 else "error",)
+			except FileNotFoundError:
+				self.logger.alert("{} compiler is not installed!", self.compile, self.compiler)
+				timer.label_values = ("error",)
+			except subprocess.TimeoutExpired:
+				stdout = b"Your program must compile under %b seconds!" % str(COMPILATION_TIMEOUT).encode("ascii")
+
+		return (target_filename, stdout)
+
+	@traced("line_table")
+	def line_table(self, target_filename: str, source_filename: str) -> dict[int: list[int]]:
+		"""
+		Read the DWARF line table of a compiled file. It is extracted once and cached next to the compiled file
+		:param target_filename: Name of the compiled file (must sit in the output directory)
+		:param source_filename: Name of its source file, lines of other files (headers) are skipped
+		:return: Line of the source file -> addresses of statements starting on it
+		"""
+		binary_path = join(self.debug_output_dir, target_filename)
+		cache_path = binary_path + ".lines.json"
+
+		if os.path.exists(cache_path):
+			with open(cache_path, "r") as f:
+				return {int(line): addresses for line, addresses in json.load(f).items()}
+
+		table: dict[int: list[int]] = {}
+
 		try:
-			stdout = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=COMPILATION_TIMEOUT).stderr
-			stdout = shorten_bytes(stdout)
+			dump = subprocess.run(["objdump", "--wide", "--dwarf=decodedline", binary_path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=LINE_TABLE_TIMEOUT).stdout
 		except FileNotFoundError:
-			self.logger.alert(f"{self.compiler} compiler is not installed!", self.compile)
+			self.logger.alert("objdump is not installed!", self.line_table)
+			return table
 		except subprocess.TimeoutExpired:
-			stdout = b"Your program must compile under %b seconds!" % str(COMPILATION_TIMEOUT).encode("ascii")
+			self.logger.warn("Reading line table of {} timed out", self.line_table, target_filename)
+			return table
 
-		return (target_filename, stdout)
+		# --wide, otherwise long file names (like "<uuid4>.cpp") are cut to their last 35 characters
+		# Rows look like: "file.cpp   8   0x117f   x" (file name, line, address, view (optional), "x" if it is a statement)
+		for row in dump.decode("utf-8", errors="replace").split("\n"):
+			parts = row.split()
+			if len(parts) < 4 or parts[0] != source_filename or not parts[1].isdigit() or not parts[2].startswith("0x") or parts[-1] != "x":
+				continue
+			table.setdefault(int(parts[1]), []).append(int(parts[2], 16))
+
+		with open(cache_path, "w") as f:
+			json.dump(table, f)
+
+		return table
@@ -4,7 +4,9 @@ import pexpect
 import subprocess
 
 import docker_response_status as DckStatus
-from server import DEBUGGER_TIMEOUT, DEBUGGER_CPU_LIMIT, CGROUP_NAME, DOCKER_IMAGE_BUILD_TIMEOUT
+from metrics_manager import docker_build_seconds
+from trace_manager import traced
+from server import DEBUGGER_TIMEOUT, DEBUGGER_CPU_LIMIT, CGROUP_NAME, DOCKER_IMAGE_BUILD_TIMEOUT, DEBUGGER_TMPFS_SIZE_MB
 
 class DockerManager():
 	
@@ -19,6 +21,7 @@ class DockerManager():
 	For debugger
 	'''
 
+	@traced("docker_build")
 	def build_for_debugger(self, executable_file_name: str, source_file_name: str, stdin_file_name: str) -> tuple[str, bytes]:
 		try: stdout = subprocess.check_output(["cp", f"{self.gdb_printers_dir}/printers.py", self.debug_dir])
 		except: return (DckStatus.internal_docker_manager_error, b"")
@@ -55,18 +58,21 @@ class DockerManager():
 		with open(f"{self.debug_dir}/dockerfile", "w") as f:
 			f.write(content)
 
-		try:
-			stdout = subprocess.check_output(["docker", "build", "-t", self.debug_image_name, self.debug_dir], stderr=subprocess.STDOUT, timeout=DOCKER_IMAGE_BUILD_TIMEOUT)
-			status = DckStatus.success
-		except FileNotFoundError:
-			status = DckStatus.internal_docker_manager_error
-		except:
-			status = DckStatus.docker_build_error
+		with docker_build_seconds.time() as timer:
+			try:
+				stdout = subprocess.check_output(["docker", "build", "-t", self.debug_image_name, self.debug_dir], stderr=subprocess.STDOUT, timeout=DOCKER_IMAGE_BUILD_TIMEOUT)
+				status = DckStatus.success
+			except FileNotFoundError:
+				status = DckStatus.internal_docker_manager_error
+			except:
+				status = DckStatus.docker_build_error
+			timer.label_values = (status,)
 
 		return (status, stdout)
 
+	@traced("docker_run")
 	def run_for_debugger(self, container_name: str, memory_limit_MB: int) -> pexpect.spawnu:
-		process = pexpect.spawnu("docker", ["run", "--rm", "--cap-drop=ALL", "--cap-add=SYS_PTRACE", "--security-opt", "seccomp=unconfined", "--memory-swap=256m", "--read-only", "--tmpfs", "/tmp", f"--cgroup-parent={CGROUP_NAME}", f"--cpus={DEBUGGER_CPU_LIMIT}", "--network=none", "--memory", f"{memory_limit_MB}m", "--name", container_name, "-i", self.debug_image_name, "gdb", "./a.out", "--interpreter=mi3", "--quiet"], timeout=DEBUGGER_TIMEOUT)
+		process = pexpect.spawnu("docker", ["run", "--rm", "--cap-drop=ALL", "--cap-add=SYS_PTRACE", "--security-opt", "seccomp=unconfined", "--memory-swap=256m", "--read-only", "--tmpfs", f"/tmp:size={DEBUGGER_TMPFS_SIZE_MB}m,exec", f"--cgroup-parent={CGROUP_NAME}", f"--cpus={DEBUGGER_CPU_LIMIT}", "--network=none", "--memory", f"{memory_limit_MB}m", "--name", container_name, "-i", self.debug_image_name, "gdb", "./a.out", "--interpreter=mi3", "--quiet"], timeout=DEBUGGER_TIMEOUT)
 
 		return process
 
@@ -74,6 +80,20 @@ class DockerManager():
 	Additional methods.
 	'''
 
+	def copy_to_container(self, container_name: str, source_path: str, target_path: str, executable: bool = False) -> bool:
+		"""
+		Copies a file into running container. Its root filesystem is read-only and docker cp can't write into tmpfs, so the file is streamed through docker exec
+		:param target_path: Path inside the container, must be in /tmp
+		:return: Was the file copied
+		"""
+		command = f"cat > {target_path}" + (f" && chmod 700 {target_path}" if executable else "")
+		try:
+			with open(source_path, "rb") as f:
+				subprocess.run(["docker", "exec", "-i", container_name, "sh", "-c", command], stdin=f, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=DEBUGGER_TIMEOUT, check=True)
+			return True
+		except (subprocess.SubprocessError, OSError):
+			return False
+
 	def stop_container(self, container_name: str) -> None:
 		subprocess.run(["docker", "kill", container_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
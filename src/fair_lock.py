@@ -0,0 +1,39 @@
+from collections import deque
+from threading import Lock
+
+class FairLock:
+	"""
+	Lock taken in the order of acquire calls. Released lock is handed over directly to the longest waiting thread,
+	so (unlike eventlet's lock) a thread coming later can't take it first. Session's actions are executed in the order they came
+	"""
+	def __init__(self):
+		self.state_lock = Lock() # Guards locked and waiters
+		self.locked: bool = False
+		self.waiters: deque[Lock] = deque() # Each held until its thread gets the lock
+
+	def acquire(self, blocking: bool = True) -> bool:
+		with self.state_lock:
+			if not self.locked:
+				self.locked = True
+				return True
+			if not blocking:
+				return False
+			waiter = Lock()
+			waiter.acquire()
+			self.waiters.append(waiter)
+		waiter.acquire() # Released by release(), the lock is ours then
+		return True
+
+	def release(self) -> None:
+		with self.state_lock:
+			if self.waiters:
+				self.waiters.popleft().release() # Stays locked, ownership passes to the waiter
+			else:
+				self.locked = False
+
+	def __enter__(self) -> "FairLock":
+		self.acquire()
+		return self
+
+	def __exit__(self, *exception: object) -> None:
+		self.release()
@@ -1,16 +1,21 @@
 import os
 import ast
+import hashlib
 import pexpect
 from typing import Optional, Any
 from pygdbmi.gdbmiparser import parse_response
 from uuid import uuid4
-from time import time
+from time import time, perf_counter
 
 import docker_response_status as DckStatus
+from fair_lock import FairLock
+from breakpoint_manager import BreakpointManager
 from compiler_manager import Compiler
 from docker_manager import DockerManager
 from logger import Logger
-from server import DEBUG_DIR, DEBUGGER_MEMORY_LIMIT_MB, EXPECT_VALUES_AFTER_GDB_COMMAND
+from metrics_manager import gdb_startup_seconds, extractor_seconds, extractor_payload_bytes, extractor_output_seconds, extractor_variable_seconds, printer_seconds, printer_elements, teardown_seconds
+from trace_manager import tracer, traced
+from server import DEBUG_DIR, DEBUGGER_MEMORY_LIMIT_MB, EXPECT_VALUES_AFTER_GDB_COMMAND, STDOUT_TAIL_SIZE, DEBUGGER_TIMEOUT, MOVE_WAIT_TIME, RUN_CPU_TIME_LIMIT, EXTRACTOR_PROFILE_TO_CLIENT
 
 class GDBDebugger:
 
@@ -24,17 +29,21 @@ class GDBDebugger:
 		self.input_file_name = input_file_name
 		self.ip = ip
 
-		self.last_ping_time: int = time() # time in seconds from the last time client pinged this class
+		self.last_ping_time: int = time() # time in seconds from the last action of the client (every action counts as ping)
+		self.lock = FairLock() # Held while GDB is used, so only one command at a time talks with this session's GDB
 
 		self.gdb_init_input = [
+			"-gdb-set mi-async on", # Execution commands return immediately, so a running program can be watched and interrupted
 			"python import sys; sys.path.insert(0, '/usr/share/gcc/13/python')",
 			"python from libstdcxx.v6.printers import register_libstdcxx_printers",
 			"python register_libstdcxx_printers(None)",
+			"python sys.path.insert(0, '/app')",
+			"python import data_extractor",
 			"skip -gfi /usr/include/*",
 			"skip -gfi /usr/include/c++/14/*",
 			"skip -gfi /usr/include/c++/14/bits/*",
-			"break *main",
-			"run < input > /tmp/output"
+			"tbreak *main", # Temporary, so it can be set again for restart with a new binary
+			"run < input >> /tmp/output" # Appending, so extractor can empty the file when it gets too big
 		]
 
 		self.compiled_file_name = ""
@@ -44,6 +53,20 @@ class GDBDebugger:
 
 		self.docker_manager = DockerManager(self.debug_dir, self.gdb_printers_dir, self.data_extractor_dir)
 		self.has_been_initialized: bool = False # Was init_process run
+		self.type_names: dict[int: str] = {} # Type dictionary of structured values, sent to the client only once
+		self.global_variables: dict[str: dict[str: Any]] = {} # Last extracted value of every global, extractor skips unchanged ones
+		self.stdout_tail: str = "" # Last STDOUT_TAIL_SIZE characters of program's output (extractor sends only new output)
+		self.stdout_truncated: bool = False # Was any of program's output skipped
+		self.source_hash: str = "" # Hash of the compiled code, restart recompiles only if it changed
+		self.last_state: Optional[dict[str, Any]] = None # Debug data of the last stop, sent again to a client, which reattaches
+		self.breakpoints = BreakpointManager(self.input_file_name)
+		self.next_token: int = 1 # Token of the next pipelined MI command
+
+		self.is_executing: bool = False # Is debugged program running (after step/continue/finish), see poll_execution
+		self.cpu_time: float = 0 # CPU time used by debugged program, as of the last stop
+		self.run_start_cpu_time: float = 0 # CPU time used by debugged program, when the current execution started
+		self.cpu_time_limit_exceeded: bool = False # Was the current execution interrupted because of RUN_CPU_TIME_LIMIT
+		self.pending_stop: Optional[tuple[dict[str, Any], list[dict[str, Any]]]] = None # *stopped record (and output before it) read while waiting for something else
 
 	def ping(self) -> None:
 		'''
@@ -61,11 +84,29 @@ class GDBDebugger:
 				outputs.append(output)
 		return outputs
 
-	def check_state_after_move(self) -> dict[str: Any]:
+	@traced("check_state_after_move")
+	def check_state_after_move(self, stop: Optional[dict[str, Any]] = None, move_output: Optional[list[dict[str, Any]]] = None) -> dict[str: Any]:
+		'''
+		Extracts debug data after the program has stopped.
+		:param stop: Parsed *stopped record, it tells why the program stopped
+		:param move_output: GDB console output received before *stopped
+		'''
+		if move_output is None:
+			move_output = []
 		status, program_output = self.send_command("info program")
+		program_output = move_output + program_output
 
-		response = self.send_command("source data_extractor.py")[1][0]["payload"]
+		with extractor_seconds.time(), tracer.span("extractor"):
+			response = self.send_command(f"python print(data_extractor.main({sorted(self.global_variables)!r}))")[1][0]["payload"]
+		extractor_payload_bytes.observe(len(response))
 		out = ast.literal_eval(response)
+		self.observe_extraction(out.pop("profile", {}), out)
+		self.last_state = out
+		self.type_names.update(out["types"])
+		self.merge_unchanged_globals(out)
+		self.add_output(out["stdout"], out["stdout_truncated"])
+		self.cpu_time = out["cpu_time"]
+		out["is_executing"] = False
 
 		if status == "timeout":
 			out["is_running"] = False
@@ -73,6 +114,24 @@ class GDBDebugger:
 			self.stop()
 			return out
 
+		if stop:
+			reason = stop["payload"].get("reason", "")
+			signal = stop["payload"].get("signal-name", "")
+
+			if reason.startswith("exited"):
+				out["is_running"] = False
+				if reason == "exited-signalled":
+					out["runtime_error"] = True
+					out["runtime_error_details"] = f"{signal}, {stop['payload'].get('signal-meaning', '')}."
+				self.stop()
+			elif reason == "signal-received" and signal not in ["SIGINT", "SIGTRAP"]: # SIGINT is sent by pause()
+				out["is_running"] = False
+				out["runtime_error"] = True
+				out["runtime_error_details"] = f"{signal}, {stop['payload'].get('signal-meaning', '')}."
+				self.stop()
+
+			return out
+
 		for output in program_output:
 			if output["payload"] == "The program being debugged is not being run.\n":
 				out["is_running"] = True
@@ -93,56 +152,231 @@ class GDBDebugger:
 
 		return out
 
-	def change_breakpoints(self, add_breakpoints: list[int], remove_breakpoints: list[int]) -> list[int]:
-		if add_breakpoints != []:
-			self.send_command_group([f"break {bp}" for bp in add_breakpoints], EXPECT_VALUES_AFTER_GDB_COMMAND)
-		if remove_breakpoints != []:
-			self.send_command_group([f"clear {bp}" for bp in remove_breakpoints], EXPECT_VALUES_AFTER_GDB_COMMAND)
+	def observe_extraction(self, profile: dict[str: Any], out: dict[str: Any]) -> None:
+		'''
+		Puts extractor's measurements of this stop into metrics (and into the response, if EXTRACTOR_PROFILE_TO_CLIENT).
+		'''
+		if not profile:
+			return
+		extractor_output_seconds.observe(profile["output_seconds"])
+		for scope, times in profile["variable_seconds"].items(): # Every variable, "variables" lists only the slowest ones
+			for seconds in times:
+				extractor_variable_seconds.observe(seconds, scope)
+		for printer, stats in profile["printers"].items():
+			printer_seconds.observe(stats["self_seconds"], printer)
+			printer_elements.inc(printer, amount=stats["elements"])
+
+		if EXTRACTOR_PROFILE_TO_CLIENT:
+			out["profile"] = profile
+
+	def resume_state(self) -> dict[str: Any]:
+		'''
+		Whole state for a client reattaching to the session: debug data of the last stop with all types, all globals and all kept output.
+		'''
+		out = dict(self.last_state) if self.last_state else {"is_running": True}
+		out["types"] = dict(self.type_names)
+		out["unchanged_globals"] = []
+		out["stdout"] = self.stdout_tail
+		out["stdout_truncated"] = self.stdout_truncated
+		out["is_executing"] = self.is_executing
+		out["breakpoints"] = self.breakpoints.lines()
+		out["breakable_lines"] = self.breakpoints.breakable_lines
+		return out
 
-	def step(self, add_breakpoints: list[int], remove_breakpoints: list[int]) -> dict[str: Any]:
-		self.change_breakpoints(add_breakpoints, remove_breakpoints)
-		self.send_command("step")
-		return self.check_state_after_move()
+	def add_output(self, stdout: str, truncated: bool) -> None:
+		self.stdout_truncated = self.stdout_truncated or truncated or len(self.stdout_tail) + len(stdout) > STDOUT_TAIL_SIZE
+		self.stdout_tail = (self.stdout_tail + stdout)[-STDOUT_TAIL_SIZE:]
+
+	def merge_unchanged_globals(self, out: dict[str: Any]) -> None:
+		'''
+		Replaces globals, which extractor reported as unchanged, with their last extracted values.
+		Names of them are listed in out["unchanged_globals"], so client doesn't have to render them again.
+		'''
+		global_variables = []
+		unchanged_globals = []
+		for variable in out["global_variables"]:
+			name = variable["variable_name"]
+			if variable.get("unchanged"):
+				if name not in self.global_variables: # Extractor is told, which globals are kept, so this shouldn't happen
+					self.logger.alert("Global {} was reported unchanged, but its value isn't kept", self.merge_unchanged_globals, name)
+					continue
+				unchanged_globals.append(name)
+				variable = self.global_variables[name]
+			else:
+				self.global_variables[name] = variable
+			global_variables.append(variable)
+
+		out["global_variables"] = global_variables
+		out["unchanged_globals"] = unchanged_globals
+
+	def change_breakpoints(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> list[int]:
+		'''
+		Sets only breakpoints, which are not set yet and deletes only these, which are set, in one round trip.
+		:return: Lines with breakpoints set
+		'''
+		requested = self.breakpoints.requested_lines(add_breakpoints, remove_breakpoints, breakpoints)
+		to_insert, to_delete = self.breakpoints.diff(requested)
+
+		if to_insert or to_delete:
+			responses = self.send_pipelined(self.breakpoints.commands(to_insert, to_delete))
+			self.breakpoints.apply(to_insert, to_delete, responses)
+
+		return self.breakpoints.lines()
+
+	def move(self, command: str, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> dict[str: Any]:
+		self.change_breakpoints(add_breakpoints, remove_breakpoints, breakpoints)
+		out = self.execute(command)
+		out["breakpoints"] = self.breakpoints.lines()
+		out["moved_breakpoints"] = self.breakpoints.moved
+		out["rejected_breakpoints"] = sorted(self.breakpoints.rejected)
+		return out
+
+	def execute(self, command: str) -> dict[str: Any]:
+		'''
+		Starts execution command (step/continue/finish) and waits MOVE_WAIT_TIME for the program to stop.
+		If it doesn't stop, it is left running and poll_execution() must be called until it stops.
+		'''
+		self.run_start_cpu_time = self.cpu_time
+		self.cpu_time_limit_exceeded = False
+
+		status, _ = self.send_command(command)
+		if status != "^running":
+			return self.check_state_after_move()
+
+		self.is_executing = True
+		return self.poll_execution(MOVE_WAIT_TIME)
+
+	@traced("poll_execution")
+	def poll_execution(self, wait: float = 0) -> dict[str: Any]:
+		'''
+		Checks running program.
+		:return: Debug data if program has stopped, otherwise progress: {"is_executing": True, "cpu_time": ..., "stdout": ...}
+		'''
+		stop, move_output = self.wait_for_stop(wait)
+		if stop is not None:
+			self.is_executing = False
+			out = self.check_state_after_move(stop, move_output)
+			out["cpu_time_limit_exceeded"] = self.cpu_time_limit_exceeded
+			return out
+
+		response = self.send_command("python print(data_extractor.progress())")[1]
+		progress = ast.literal_eval(response[0]["payload"]) if response else {"cpu_time": self.run_start_cpu_time, "stdout": "", "stdout_truncated": False}
+		self.add_output(progress["stdout"], progress["stdout_truncated"])
+
+		progress["cpu_time"] -= self.run_start_cpu_time
+		progress["is_running"] = True
+		progress["is_executing"] = True
+
+		if progress["cpu_time"] > RUN_CPU_TIME_LIMIT and not self.cpu_time_limit_exceeded:
+			self.logger.debug("Program in {} exceeded CPU time limit, interrupting", self.poll_execution, self.container_name)
+			self.cpu_time_limit_exceeded = True
+			self.pause()
+
+		return progress
+
+	def wait_for_stop(self, timeout: float) -> tuple[Optional[dict[str, Any]], list[dict[str, Any]]]:
+		'''
+		:return: Parsed *stopped record (None if program didn't stop in timeout) and GDB console output before it
+		'''
+		if self.pending_stop:
+			stop, self.pending_stop = self.pending_stop, None
+			return stop
+
+		try:
+			self.process.expect(r"(?:\A|\n)(\*stopped[^\r\n]*)\r?\n", timeout=timeout)
+		except pexpect.TIMEOUT:
+			return (None, [])
+		except pexpect.EOF:
+			self.logger.warn("GDB process in {} has ended while program was running", self.wait_for_stop, self.container_name)
+			return ({"payload": {"reason": "exited"}}, [])
+
+		return (parse_response(self.process.match.group(1)), self.get_formatted_gdb_output())
+
+	def pause(self) -> dict[str: Any]:
+		'''
+		Interrupts running program. Its state is returned by the next poll_execution().
+		'''
+		if self.is_executing:
+			self.send_command("-exec-interrupt")
+		return {"is_executing": self.is_executing}
+
+	def step(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None, count: int = 1) -> dict[str: Any]:
+		return self.move("step" if count == 1 else f"step {count}", add_breakpoints, remove_breakpoints, breakpoints)
 
 	def run(self) -> dict[str: Any]:
 		self.send_command("run")
 		return self.check_state_after_move()
 	
-	def continue_(self, add_breakpoints: list[int], remove_breakpoints: list[int]) -> dict[str: Any]:
-		self.change_breakpoints(add_breakpoints, remove_breakpoints)
-		self.send_command("continue")
-		return self.check_state_after_move()
+	def continue_(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> dict[str: Any]:
+		return self.move("continue", add_breakpoints, remove_breakpoints, breakpoints)
 
-	def finish(self, add_breakpoints: list[int], remove_breakpoints: list[int]) -> dict[str: Any]:
-		self.change_breakpoints(add_breakpoints, remove_breakpoints)
-		self.send_command("finish")
-		return self.check_state_after_move()
+	def finish(self, add_breakpoints: list[int], remove_breakpoints: list[int], breakpoints: Optional[list[int]] = None) -> dict[str: Any]:
+		return self.move("finish", add_breakpoints, remove_breakpoints, breakpoints)
 
 	def send_command(self, command: str, whole_output: bool = False) -> tuple[str, list[dict[str: Any]]]:	
-		which_response: str = ""
-		try:
-			self.process.sendline(command)
+		with tracer.span("send_command", command=command[:100]):
+			which_response: str = ""
+			try:
+				self.process.sendline(command)
 
-			which_response = EXPECT_VALUES_AFTER_GDB_COMMAND[self.process.expect_exact(EXPECT_VALUES_AFTER_GDB_COMMAND)]
+				which_response = EXPECT_VALUES_AFTER_GDB_COMMAND[self.process.expect_exact(EXPECT_VALUES_AFTER_GDB_COMMAND)]
 			
-			self.logger.spam(f"Command {command} was successfully sent to gdb process!", self.send_command)
+				self.logger.spam("Command {} was successfully sent to gdb process!", self.send_command, command)
 
-		except pexpect.TIMEOUT:
-			self.logger.warn(f"Timeout from command {command}", self.send_command)
-			return ("timeout", {})
+			except pexpect.TIMEOUT:
+				self.logger.warn("Timeout from command {}", self.send_command, command)
+				return ("timeout", {})
 
+			except Exception as e:
+				self.logger.alert("Couldn't send {} command to gdb process | {}: {}", self.send_command, command, e.__class__.__name__, e)
+
+			formatted_output = self.get_formatted_gdb_output(whole_output)
+			self.keep_stop_record(formatted_output)
+			return (which_response, formatted_output)
+
+	def keep_stop_record(self, formatted_output: list[dict[str: Any]]) -> None:
+		'''
+		Program can stop while other command is sent (e.g. progress while running), so *stopped record
+		would be read by that command. It is kept for wait_for_stop().
+		'''
+		if not self.is_executing or self.pending_stop:
+			return
+		for line in self.process.before.split('\n'):
+			if line.startswith("*stopped"):
+				self.pending_stop = (parse_response(line.strip()), formatted_output)
+				return
+
+	def send_pipelined(self, commands: list[str]) -> list[Optional[dict[str, Any]]]:
+		'''
+		Sends all MI commands at once with tokens and then collects their result records.
+		:return: Parsed result record for every command (None if it didn't come before timeout)
+		'''
+		tokens = list(range(self.next_token, self.next_token + len(commands)))
+		self.next_token += len(commands)
+		results: dict[int: dict[str: Any]] = {}
+
+		try:
+			self.process.send("".join(f"{token}{command}\n" for token, command in zip(tokens, commands)))
+			while len(results) < len(commands):
+				self.process.expect(r"(?:\A|\n)(\d+\^\w+[^\r\n]*)\r?\n") # Whole line of result record
+				response = parse_response(self.process.match.group(1))
+				if response["token"] in tokens:
+					results[response["token"]] = response
+			self.logger.spam("Pipelined {} command(s) to gdb process", self.send_pipelined, len(commands))
+		except pexpect.TIMEOUT:
+			self.logger.warn("Timeout from pipelined commands {}", self.send_pipelined, commands)
 		except Exception as e:
-			self.logger.alert(f"Couldn't send {command} command to gdb process | {e.__class__.__name__}: {e}", self.send_command)
+			self.logger.alert("Couldn't send pipelined commands to gdb process | {}: {}", self.send_pipelined, e.__class__.__name__, e)
 
-		formatted_output = self.get_formatted_gdb_output(whole_output)
-		return (which_response, formatted_output)
+		return [results.get(token) for token in tokens]
 
 	def send_command_group(self, commands: list[str], expect_what: str | list[str]) -> None:
-		self.logger.debug(f"Sending group of commands", self.send_command_group)
+		self.logger.debug("Sending group of commands", self.send_command_group)
 		for command in commands:
 			self.process.sendline(command)
 		self.process.expect_exact(expect_what)
 
+	@traced("init_process")
 	def init_process(self, input_: str) -> tuple[int, bytes]:
 		self.logger.debug("Compiling for debugging", self.init_process)
 
@@ -160,37 +394,116 @@ class GDBDebugger:
 		self.logger.debug("Building docker container", self.init_process)
 
 		self.compiled_file_name = output_file_name
+		self.source_hash = self.hash_source()
+		self.breakpoints.set_breakable_lines(list(self.compiler.line_table(self.compiled_file_name, self.input_file_name)))
 		status, stdout = self.docker_manager.build_for_debugger(self.compiled_file_name, self.input_file_name, self.stdin_input_file)
 
-		self.logger.debug(f"docker build debugger: {status}", self.init_process)
-		self.logger.spam(f"{stdout}", self.init_process)
+		self.logger.debug("docker build debugger: {}", self.init_process, status)
+		self.logger.spam("{}", self.init_process, stdout)
 
 		if status in [DckStatus.docker_build_error, DckStatus.internal_docker_manager_error]:
 			self.has_been_initialized = True # If it fails, it should be cleaned
-			self.logger.alert(f"Building error: {status}", self.init_process)
+			self.logger.alert("Building error: {}", self.init_process, status)
 			return (-2, stdout)
 
+		start = perf_counter()
 		self.process = self.docker_manager.run_for_debugger(self.container_name, DEBUGGER_MEMORY_LIMIT_MB)
 
 		try:
 			self.process.expect_exact("(gdb)")
+			gdb_startup_seconds.observe(perf_counter() - start)
 			self.logger.spam(self.process.before, self.init_process)
-			self.logger.debug(f"Process has been correctly started!", self.init_process)
+			self.logger.debug("Process has been correctly started!", self.init_process)
 		except:
 			self.logger.spam(self.process.before, self.init_process)
 			self.logger.alert("Starting went wrong...", self.init_process)
 
 		self.send_command_group(self.gdb_init_input, "^running")
+		self.wait_for_stop(DEBUGGER_TIMEOUT) # Program stops on *main
 
 		self.has_been_initialized = True
 
 		return (0, bytes())
 
+	def hash_source(self) -> str:
+		with open(os.path.join(self.received_dir, self.input_file_name), "rb") as f:
+			return hashlib.sha256(f.read()).hexdigest()
+
+	@traced("restart")
+	def restart(self, code: str, input_: str) -> dict[str: Any]:
+		'''
+		Runs the program again from main in the same container and GDB, with new input and new code (recompiled only if it has changed).
+		Breakpoints are kept, for new code they are moved to its lines with code.
+		:return: Debug data after the program stops on main, or {"compilation_error": True, ...}, then the old program is kept
+		'''
+		new_binary = hashlib.sha256(code.encode("utf-8")).hexdigest() != self.source_hash
+
+		if new_binary:
+			self.logger.debug("Recompiling for restart", self.restart)
+			with open(os.path.join(self.received_dir, self.input_file_name), "w") as f:
+				f.write(code)
+			for file_name in [self.compiled_file_name, self.compiled_file_name + ".lines.json"]:
+				if self.compiled_file_name and os.path.exists(os.path.join(self.debug_dir, file_name)):
+					os.remove(os.path.join(self.debug_dir, file_name)) # So an old binary isn't taken for the result of failed compilation
+
+			output_file_name, stdout = self.compiler.compile(self.input_file_name)
+			if not os.path.exists(os.path.join(self.debug_dir, output_file_name)):
+				self.compiled_file_name = ""
+				return {"compilation_error": True, "compilation_error_details": stdout.decode("utf-8", errors="replace")}
+			self.compiled_file_name = output_file_name
+
+			if not self.docker_manager.copy_to_container(self.container_name, os.path.join(self.debug_dir, self.compiled_file_name), "/tmp/a.out", executable=True):
+				self.logger.alert("Couldn't copy new binary into {}", self.restart, self.container_name)
+				return {"compilation_error": True, "compilation_error_details": "Server couldn't load the new program"}
+			self.source_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+		with open(os.path.join(self.debug_dir, self.stdin_input_file), "w") as f:
+			f.write(input_)
+		self.docker_manager.copy_to_container(self.container_name, os.path.join(self.debug_dir, self.stdin_input_file), "/tmp/input")
+
+		if self.is_executing:
+			self.send_command("-exec-interrupt")
+			self.wait_for_stop(DEBUGGER_TIMEOUT)
+		self.send_command("kill")
+
+		if new_binary:
+			self.send_command("-file-exec-and-symbols /tmp/a.out")
+			lines = self.breakpoints.lines()
+			self.change_breakpoints([], [], []) # Old breakpoints are deleted, then set on lines with code of the new program
+			self.breakpoints = BreakpointManager(self.input_file_name)
+			self.breakpoints.set_breakable_lines(list(self.compiler.line_table(self.compiled_file_name, self.input_file_name)))
+			self.change_breakpoints([], [], lines)
+
+		self.send_command("python data_extractor.reset()")
+		self.type_names = {}
+		self.global_variables = {}
+		self.stdout_tail = ""
+		self.stdout_truncated = False
+		self.last_state = None
+		self.is_executing = False
+		self.cpu_time = 0
+		self.pending_stop = None
+
+		self.send_command("tbreak *main")
+		self.send_command("run < /tmp/input >> /tmp/output")
+		out = self.check_state_after_move(*self.wait_for_stop(DEBUGGER_TIMEOUT))
+		out["breakpoints"] = self.breakpoints.lines()
+		out["moved_breakpoints"] = self.breakpoints.moved
+		out["breakable_lines"] = self.breakpoints.breakable_lines
+		return out
+
+	@traced("stop")
 	def stop(self) -> None:
-		self.logger.debug(f"Stopping container {self.container_name}", self.stop)
+		with teardown_seconds.time():
+			self.teardown()
+
+	def teardown(self) -> None:
+		self.logger.debug("Stopping container {}", self.stop, self.container_name)
 
 		if self.compiled_file_name:
 			os.remove(os.path.join(self.debug_dir, self.compiled_file_name))
+			if os.path.exists(os.path.join(self.debug_dir, self.compiled_file_name + ".lines.json")):
+				os.remove(os.path.join(self.debug_dir, self.compiled_file_name + ".lines.json"))
 			self.compiled_file_name = ""
 		
 		if os.path.exists(os.path.join(self.received_dir, self.input_file_name)) and self.input_file_name != "":
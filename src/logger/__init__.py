@@ -1,45 +1,80 @@
-from typing import Callable, Any
+from collections import deque
+from time import time
+from typing import Callable, Any, Optional
 
 from .colors import Color
+from .writer import LogWriter
 
 class Logger:
 
-    def __init__(self, display_logs: bool = True, display_layer: int = 0) -> None:
-        self.logs = []
+    def __init__(self, display_logs: bool = True, display_layer: int = 0, max_logs: int = 1000, writer: Optional[LogWriter] = None) -> None:
+        """
+        :param display_layer: Lowest level (Color.*_ID), which is logged at all. Lower ones are skipped before any formatting
+        :param max_logs: How many recent logs are kept in memory
+        :param writer: Also writes logs to a file (as JSON lines)
+        """
+        self.logs: deque[tuple[float, str, str, str]] = deque(maxlen=max_logs) # (time, type, from, message)
         self.display_logs = display_logs
         self.display_layer = display_layer
+        self.writer = writer
+
+    # Messages can be given lazily, as a format string with args ("Data: {}", data), which is formatted only, if the level is logged
 
     # For messages, which will pop up very often
     # For messages, which show some commands output
-    def spam(self, message: str, from_: Callable[[Any, ...], Any]) -> None:
-        self._log_any(message, from_, "SPAM", Color.SPAM, Color.SPAM_ID)
+    def spam(self, message: str, from_: Callable[[Any, ...], Any], *args: Any) -> None:
+        if self.display_layer <= Color.SPAM_ID:
+            self._log_any(message, from_, args, "SPAM", Color.SPAM, Color.SPAM_ID)
 
     # For messages, which tells at what stage checker/debugger currently is
     # For messages, after receiving some requests
-    def debug(self, message: str, from_: Callable[[Any, ...], Any]) -> None:
-        self._log_any(message, from_, "DEBUG", Color.DEBUG, Color.DEBUG_ID)
+    def debug(self, message: str, from_: Callable[[Any, ...], Any], *args: Any) -> None:
+        if self.display_layer <= Color.DEBUG_ID:
+            self._log_any(message, from_, args, "DEBUG", Color.DEBUG, Color.DEBUG_ID)
 
     # For user submissions related little errors
-    def warn(self, message: str, from_: Callable[[Any, ...], Any]) -> None:
-        self._log_any(message, from_, "WARNING", Color.WARNING, Color.WARNING_ID)
+    def warn(self, message: str, from_: Callable[[Any, ...], Any], *args: Any) -> None:
+        if self.display_layer <= Color.WARNING_ID:
+            self._log_any(message, from_, args, "WARNING", Color.WARNING, Color.WARNING_ID)
 
     # For server operation related little errors
-    def alert(self, message: str, from_: Callable[[Any, ...], Any]) -> None:
-        self._log_any(message, from_, "ALERT", Color.ALERT, Color.ALERT_ID)
+    def alert(self, message: str, from_: Callable[[Any, ...], Any], *args: Any) -> None:
+        if self.display_layer <= Color.ALERT_ID:
+            self._log_any(message, from_, args, "ALERT", Color.ALERT, Color.ALERT_ID)
 
     # For important server errors
-    def error(self, message: str, from_: Callable[[Any, ...], Any]) -> None:
-        self._log_any(message, from_, "ERROR", Color.ERROR, Color.ERROR_ID)
+    def error(self, message: str, from_: Callable[[Any, ...], Any], *args: Any) -> None:
+        if self.display_layer <= Color.ERROR_ID:
+            self._log_any(message, from_, args, "ERROR", Color.ERROR, Color.ERROR_ID)
 
     # For general information about server procedures
-    def info(self, message: str, from_: Callable[[Any, ...], Any]) -> None:
-        self._log_any(message, from_, "INFO", Color.INFO, Color.INFO_ID)
+    def info(self, message: str, from_: Callable[[Any, ...], Any], *args: Any) -> None:
+        if self.display_layer <= Color.INFO_ID:
+            self._log_any(message, from_, args, "INFO", Color.INFO, Color.INFO_ID)
+
+    def recent(self, count: Optional[int] = None) -> list[str]:
+        """
+        :return: Last count (all kept, if None) logs, formatted as they are displayed
+        """
+        logs = list(self.logs)[-count:] if count else list(self.logs)
+        return [self._format(type_, from_name, message) for _, type_, from_name, message in logs]
 
-    def _log_any(self, message: str, from_: Callable[[Any, ...], Any], type_: str, color: str, id_: int) -> None:
-        if "__self__" in from_.__dir__():
-            self.logs.append(f"{Color.FROM}FROM: {from_.__self__.__class__.__name__}.{from_.__name__} {color}{type_}:{Color.NORMAL} {message}")
+    def _log_any(self, message: str, from_: Callable[[Any, ...], Any], args: tuple[Any, ...], type_: str, color: str, id_: int) -> None:
+        if args:
+            message = message.format(*args)
+        if hasattr(from_, "__self__"):
+            from_name = f"{from_.__self__.__class__.__name__}.{from_.__name__}"
         else:
-            self.logs.append(f"{Color.FROM}FROM: {from_.__name__ if from_.__name__ != 'main' else 'app.main'} {color}{type_}:{Color.NORMAL} {message}")
+            from_name = from_.__name__ if from_.__name__ != 'main' else 'app.main'
+
+        now = time()
+        self.logs.append((now, type_, from_name, message))
+
+        if self.writer:
+            self.writer.write({"time": now, "level": type_, "from": from_name, "message": message})
+
+        if self.display_logs:
+            print(self._format(type_, from_name, message, color))
 
-        if self.display_logs and self.display_layer <= id_:
-            print(self.logs[-1])
+    def _format(self, type_: str, from_name: str, message: str, color: str = "") -> str:
+        return f"{Color.FROM}FROM: {from_name} {color or getattr(Color, type_)}{type_}:{Color.NORMAL} {message}"
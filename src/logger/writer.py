@@ -0,0 +1,86 @@
+import os
+import json
+from eventlet import patcher
+from typing import Any, Optional
+
+# Not monkey patched, so writes and rotation run in a real OS thread, not on the event loop
+queue = patcher.original("queue")
+threading = patcher.original("threading")
+
+
+class LogWriter:
+    """
+    Writes log records to a file as JSON lines in a background thread, so logging never waits for the disk.
+    File is rotated, when it exceeds max_bytes (file -> file.1 -> ... -> file.{backups}, the oldest one is removed).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 << 20, backups: int = 3, queue_size: int = 10000) -> None:
+        """
+        :param queue_size: How many records can wait for writing, further ones are dropped (and counted)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue: queue.Queue[Optional[dict[str, Any]]] = queue.Queue(maxsize=queue_size)
+        self.dropped: int = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        self.size: int = self.file.tell()
+
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, record: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+
+            lines = [json.dumps(record, ensure_ascii=False, default=str)]
+            while len(lines) < 1000: # Records waiting at once are written together
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self.queue.put(None)
+                    break
+                lines.append(json.dumps(record, ensure_ascii=False, default=str))
+
+            data = "\n".join(lines) + "\n"
+            size = len(data.encode("utf-8"))
+            if self.size + size > self.max_bytes and self.size > 0:
+                self.rotate()
+            self.file.write(data)
+            self.file.flush()
+            self.size += size
+
+        self.file.close()
+
+    def rotate(self) -> None:
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = 0
+
+    def close(self) -> None:
+        """
+        Writes the waiting records and stops the thread
+        """
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable
+
+# Upper bounds of histogram buckets
+TIME_BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS: tuple[float, ...] = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+	pairs = [f'{name}="{value}"' for name, value in zip(names, values)] + ([extra] if extra else [])
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+	"""
+	Base of metrics, values are kept per tuple of label values
+	"""
+	kind = ""
+
+	def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+		self.name = name
+		self.description = description
+		self.labels = labels
+
+	def render(self) -> list[str]:
+		return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+	def samples(self) -> list[str]:
+		return []
+
+class Counter(Metric):
+	kind = "counter"
+
+	def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+		super().__init__(name, description, labels)
+		self.values: dict[tuple[str, ...]: float] = {}
+
+	def inc(self, *label_values: str, amount: float = 1) -> None:
+		self.values[label_values] = self.values.get(label_values, 0) + amount
+
+	def samples(self) -> list[str]:
+		return [f"{self.name}{format_labels(self.labels, key)} {value}" for key, value in list(self.values.items())]
+
+class Gauge(Metric):
+	"""
+	Value read, when metrics are rendered
+	"""
+	kind = "gauge"
+
+	def __init__(self, name: str, description: str, read: Callable[[], float]):
+		super().__init__(name, description)
+		self.read = read
+
+	def samples(self) -> list[str]:
+		return [f"{self.name} {self.read()}"]
+
+class Histogram(Metric):
+	"""
+	Observations counted in cumulative buckets, observing is one bisect and two additions
+	"""
+	kind = "histogram"
+
+	def __init__(self, name: str, description: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = TIME_BUCKETS):
+		super().__init__(name, description, labels)
+		self.buckets = buckets
+		self.values: dict[tuple[str, ...]: list[float]] = {} # Label values -> bucket counts (last one is +Inf), then sum
+
+	def observe(self, value: float, *label_values: str) -> None:
+		counts = self.values.get(label_values)
+		if counts is None:
+			counts = self.values[label_values] = [0] * (len(self.buckets) + 2)
+		counts[bisect_left(self.buckets, value)] += 1
+		counts[-1] += value
+
+	def time(self, *label_values: str) -> "Timer":
+		return Timer(self, label_values)
+
+	def samples(self) -> list[str]:
+		lines = []
+		for key, counts in list(self.values.items()):
+			total = 0
+			for bound, count in zip(self.buckets + ("+Inf",), counts):
+				total += count
+				bucket = f'le="{bound}"'
+				lines.append(f"{self.name}_bucket{format_labels(self.labels, key, bucket)} {total}")
+			lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {counts[-1]}")
+			lines.append(f"{self.name}_count{format_labels(self.labels, key)} {total}")
+		return lines
+
+class Timer:
+	"""
+	Observes how long the with block took. Label values can be changed inside it, e.g. to the result
+	"""
+	def __init__(self, histogram: Histogram, label_values: tuple[str, ...]):
+		self.histogram = histogram
+		self.label_values = label_values
+		self.start: float = 0
+
+	def __enter__(self) -> "Timer":
+		self.start = perf_counter()
+		return self
+
+	def __exit__(self, *exception: object) -> None:
+		self.histogram.observe(perf_counter() - self.start, *self.label_values)
+
+class MetricsRegistry:
+	"""
+	Metrics of this process, rendered in Prometheus text format
+	"""
+	def __init__(self):
+		self.metrics: dict[str: Metric] = {}
+
+	def add(self, metric: Metric) -> Metric:
+		self.metrics[metric.name] = metric
+		return metric
+
+	def counter(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Counter:
+		return self.add(Counter(name, description, labels))
+
+	def histogram(self, name: str, description: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = TIME_BUCKETS) -> Histogram:
+		return self.add(Histogram(name, description, labels, buckets))
+
+	def gauge(self, name: str, description: str, read: Callable[[], float]) -> Gauge:
+		return self.add(Gauge(name, description, read))
+
+	def render(self) -> str:
+		return "\n".join(line for metric in list(self.metrics.values()) for line in metric.render()) + "\n"
+
+metrics = MetricsRegistry()
+
+# Pipeline of a session
+compile_seconds = metrics.histogram("debugger_compile_seconds", "Compilation time", ("result",))
+docker_build_seconds = metrics.histogram("debugger_docker_build_seconds", "Docker image build time", ("result",))
+gdb_startup_seconds = metrics.histogram("debugger_gdb_startup_seconds", "Time from starting container to the first (gdb) prompt")
+command_seconds = metrics.histogram("debugger_command_seconds", "Time of handling debugger action (without waiting for the session's lock)", ("action",))
+extractor_seconds = metrics.histogram("debugger_extractor_seconds", "Time of extracting debug data in GDB")
+extractor_payload_bytes = metrics.histogram("debugger_extractor_payload_bytes", "Size of extracted debug data", buckets=SIZE_BUCKETS)
+extractor_output_seconds = metrics.histogram("debugger_extractor_output_seconds", "Time of reading program's output in GDB (per stop)")
+extractor_variable_seconds = metrics.histogram("debugger_extractor_variable_seconds", "Time of extracting one variable in GDB", ("scope",))
+printer_seconds = metrics.histogram("debugger_printer_seconds", "Time spent in pretty printer class (without nested printers) per stop", ("printer",))
+printer_elements = metrics.counter("debugger_printer_elements_total", "Elements extracted through pretty printer class (also by nested printers)", ("printer",))
+lock_wait_seconds = metrics.histogram("debugger_session_lock_wait_seconds", "Time waited for the session's lock")
+teardown_seconds = metrics.histogram("debugger_teardown_seconds", "Time of stopping a session")
+sessions_started = metrics.counter("debugger_sessions_started_total", "Started sessions by result", ("result",))
+
+# Event loop
+event_loop_lag_seconds = metrics.histogram("debugger_event_loop_lag_seconds", "How late the event loop wakes up a sleeping green thread")
+event_loop_stall_seconds = metrics.histogram("debugger_event_loop_stall_seconds", "Duration of event loop stalls (lag above STALL_THRESHOLD)")
@@ -0,0 +1,120 @@
+import io
+import sys
+import pstats
+import cProfile
+import tracemalloc
+import eventlet
+from eventlet import patcher
+from collections import Counter
+from typing import Optional
+
+# Not monkey patched, so the sampler runs in its own OS thread and sees the event loop's stack, whatever green thread runs
+real_threading = patcher.original("threading")
+real_time = patcher.original("time")
+
+# Stack of the frame as "file:function;file:function..." (outermost first), as in collapsed stacks of flamegraph.pl
+def collapse_stack(frame) -> str:
+	names = []
+	while frame is not None:
+		names.append(f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}")
+		frame = frame.f_back
+	return ";".join(reversed(names))
+
+class Profiler:
+	"""
+	Profiles this process for some seconds, while it keeps serving. Only one profile can be taken at once.
+	Sampling mode takes stacks of the event loop's thread from a real OS thread (low overhead, safe in production),
+	deterministic mode uses cProfile (exact call counts, but every call is slowed down).
+	"""
+	def __init__(self, sample_interval: float):
+		self.sample_interval = sample_interval
+		self.running: bool = False
+
+	def profile(self, seconds: float, mode: str) -> Optional[str]:
+		"""
+		Has to be called from the event loop's thread, waits (without blocking the loop) for seconds
+		:return: Collapsed stacks with sample counts (sampling) or pstats report (deterministic), None if a profile is already being taken
+		"""
+		if self.running:
+			return None
+		self.running = True
+		try:
+			if mode == "deterministic":
+				return self.deterministic(seconds)
+			return self.sampling(seconds)
+		finally:
+			self.running = False
+
+	def sampling(self, seconds: float) -> str:
+		loop_thread = real_threading.get_ident()
+		stacks: Counter[str] = Counter()
+		done = real_threading.Event()
+
+		def sample() -> None:
+			while not done.is_set():
+				frame = sys._current_frames().get(loop_thread)
+				if frame is not None:
+					stacks[collapse_stack(frame)] += 1
+				del frame
+				real_time.sleep(self.sample_interval)
+
+		sampler = real_threading.Thread(target=sample, name="profile-sampler", daemon=True)
+		sampler.start()
+		eventlet.sleep(seconds)
+		done.set()
+		sampler.join()
+
+		return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+	def deterministic(self, seconds: float) -> str:
+		profiler = cProfile.Profile()
+		profiler.enable() # Profiles the whole OS thread, so all green threads, which run in the meantime
+		eventlet.sleep(seconds)
+		profiler.disable()
+
+		out = io.StringIO()
+		pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(100)
+		return out.getvalue()
+
+class MemoryTracker:
+	"""
+	Differences of tracemalloc snapshots, to find what keeps growing. Tracing starts with the first snapshot,
+	as it slows down every allocation, and it is kept on until stop()
+	"""
+	def __init__(self, frames: int):
+		"""
+		:param frames: How many frames of every allocation's traceback are stored
+		"""
+		self.frames = frames
+		self.baseline: Optional[tracemalloc.Snapshot] = None
+
+	def snapshot(self) -> tracemalloc.Snapshot:
+		return tracemalloc.take_snapshot().filter_traces((
+			tracemalloc.Filter(False, tracemalloc.__file__),
+			tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+		))
+
+	def diff(self, limit: int, group_by: str = "lineno") -> str:
+		"""
+		:return: Biggest growths since the previous call (which becomes the new baseline)
+		"""
+		if not tracemalloc.is_tracing() or self.baseline is None:
+			tracemalloc.start(self.frames)
+			self.baseline = self.snapshot()
+			return "Tracing has started, the next call shows growth since now\n"
+
+		current = self.snapshot()
+		stats = current.compare_to(self.baseline, group_by)
+		self.baseline = current
+
+		traced, peak = tracemalloc.get_traced_memory()
+		lines = [f"Traced: {traced / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB"]
+		for stat in stats[:limit]:
+			lines.append(str(stat))
+			if group_by == "traceback":
+				lines.extend(stat.traceback.format())
+		return "\n".join(lines) + "\n"
+
+	def stop(self) -> None:
+		tracemalloc.stop()
+		self.baseline = None
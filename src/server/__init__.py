@@ -1,6 +1,6 @@
 # This file must be inside /server dictionary,
 # otherwise python runned in docker raises an error.
-from typing import Any
+from typing import Any, Optional
 
 IP: str = "127.0.0.1" # IP on which server will be run (only for testing, later unicorn affects this value)
 PORT: int = 5001 # Port on which server will be run (only for testing, later unicorn affects this value)
@@ -9,22 +9,67 @@ DEBUG_DIR: str = "../received" # Directory for debug files
 GDB_PRINTERS_DIR: str = "../gdb_printer" # Directory to printers.py used for pprint in gdb
 DATA_EXTRACTOR_DIR: str = "../data_extractor" # Directory to main.py used for extracting debug data
 SECRET_KEY: str = "gEe_5+aBG6;{4#X[bK^]k!w,mCLU-Mr" # Secret key used by flask_socketio for security
-RECEIVE_DEBUG_PING_TIME: int = 15 # After what time will not pinged Debugger class be deleted
+DISCONNECT_GRACE_TIME: int = 15 # After what time is session of disconnected client deleted (unless it reconnects)
+SESSION_IDLE_TIMEOUT: int = 1800 # After what time without any action is session deleted, even if its client is connected
 CLEANING_UNUSED_DBG_PROCESSES_TIME: int = 1 # How often should Debugger classes be checked for possible cleaning
 MAX_COMPILATION_ERROR_MESSAGE_LENGTH: int = 20 # How many lines of compilation error can be displayed
 DEBUGGER_MEMORY_LIMIT_MB: int = 128 # Memory limit for debugging process in megabytes
 DEBUGGER_CPU_LIMIT: float = 0.3 # How much percent of CPU can a container use
 DEBUGGER_TIMEOUT: int = 5 # After what time will pexpect timeout
+MOVE_WAIT_TIME: float = 0.3 # How long step/continue/finish waits for program to stop, before it is left running in background
+RUN_CPU_TIME_LIMIT: float = 20 # How much CPU time (in seconds) can program use during one continue/step/finish, before it is interrupted
+RUNNING_PROGRESS_INTERVAL: float = 1 # How often running program is checked and "still_running" is sent to the client
 EXPECT_VALUES_AFTER_GDB_COMMAND: list[str] = ["^done", "^error", "^running", "^connected", "^exit"] # What pexpect should expect from GDB MI send after command
 CGROUP_NAME: str = "informejtycy_debugger.slice" # Name of the cgroup
 COMPILATION_TIMEOUT: int = 8 # How long can program compile
 MAX_CODE_SIZE: int = 5500 # Maximum size of code sent
 DOCKER_IMAGE_BUILD_TIMEOUT: int = 40 # How long can docker image build
+DEBUGGER_TMPFS_SIZE_MB: int = 16 # Size of container's /tmp. Extractor frees output as soon as it is read, so this bounds only unread output (so infinite printing can't fill the memory)
+LINE_TABLE_TIMEOUT: int = 3 # How long can reading line table of compiled program take
+STDOUT_TAIL_SIZE: int = 1 << 16 # How many last characters of program's output are kept by the server
+SESSIONS_DIR: str = "../sessions" # Directory shared by gunicorn workers, tells which worker owns which debugging session
+WORKERS: int = 1 # How many gunicorn workers the server is run with (gunicorn -w), Socket.IO messages are passed between workers only if there are more
+SOCKETIO_MESSAGE_QUEUE: Optional[str] = None # Message queue connecting gunicorn workers (e.g. redis "redis://127.0.0.1:6379/0"), None - workers of one host are connected through unix sockets in SESSIONS_DIR
+DEBUG_AGENTS: list[str] = [] # Addresses ("host:port") of debug agents (agent.py) running the sessions, if empty sessions run in the server itself
+AGENT_PORT: int = 5002 # Default port of debug agent
+AGENT_BIND_ADDRESS: str = "127.0.0.1" # Interface, on which debug agent listens (set to the address of the network with the server)
+AGENT_SECRET: Optional[str] = None # Shared secret, which server sends to agents when connecting. Agent doesn't start without it
+AGENT_HEARTBEAT_TIME: float = 2 # How often is load of every agent checked
+AGENT_HEARTBEAT_TIMEOUT: float = 6 # After what time without a heartbeat is agent not given new sessions
+AGENT_REQUEST_TIMEOUT: float = 60 # How long server waits for agent's response (starting a session includes compilation and docker build)
+AGENT_MAX_SESSIONS: int = 20 # How many sessions can run on one agent
+MAX_CONCURRENT_SESSIONS: int = 40 # How many sessions can run at once (in one worker), further start_debugging requests wait in the queue
+ADMISSION_MAX_CPU_LOAD: float = 0.9 # Load average per core, above which no new session is started (when sessions run on this host)
+ADMISSION_MAX_MEMORY_USAGE: float = 0.85 # Fraction of used memory, above which no new session is started (when sessions run on this host)
+MAX_QUEUE_LENGTH: int = 100 # How many start_debugging requests can wait, further ones are rejected
+QUEUE_POLL_INTERVAL: float = 0.5 # How often waiting request checks, if it can be admitted
+QUEUE_UPDATE_INTERVAL: float = 3 # How often waiting client gets "queue_position"
+QUEUE_DEFAULT_ADMISSION_INTERVAL: float = 10 # Assumed time between admissions from the queue, before it is measured
+ACTION_RATE_LIMIT: float = 10 # How many debugger actions (step/continue/...) per second can one client send, further ones are rejected
+ACTION_RATE_BURST: int = 20 # How many debugger actions can one client send at once
+TRACE_SAMPLE_RATE: float = 0.05 # Which part of sessions is traced (spans downloadable from /trace/<authorization>)
+TRACE_MAX_SPANS: int = 2000 # How many last spans of one session are kept
+TRACE_MAX_SESSIONS: int = 100 # How many traces are kept (also of ended sessions)
+STALL_DETECTION: bool = True # Should event loop stalls (blocking calls in green threads) be detected and their stacks logged
+STALL_CHECK_INTERVAL: float = 0.1 # How often is event loop's lag measured
+STALL_THRESHOLD: float = 0.25 # Lag, above which event loop is considered stalled
+STALL_MAX_RECORDED: int = 50 # How many last stalls are kept
+EXTRACTOR_PROFILE_TO_CLIENT: bool = False # Should cost of every extraction (per variable and pretty printer class) be sent to the client as "profile", for debugging slow stops
+ADMIN_TOKEN: Optional[str] = None # Token for /admin endpoints (sent as "Authorization: Bearer <token>"), None disables them
+PROFILE_MAX_SECONDS: float = 60 # How long can one profile of /admin/profile take
+PROFILE_SAMPLE_INTERVAL: float = 0.005 # How often is stack sampled by sampling profiler
+TRACEMALLOC_FRAMES: int = 10 # How many frames of allocation's traceback are stored by /admin/memory
+LOG_DISPLAY_LAYER: int = 0 # Lowest logged level (0 - spam, 1 - debug, 2 - warning, 3 - alert, 4 - error, 5 - info), lower ones aren't even formatted
+LOG_BUFFER_SIZE: int = 1000 # How many recent logs are kept in memory
+LOG_FILE: Optional[str] = None # File, to which logs are written as JSON lines, "{pid}" is replaced with process id, so workers and agents don't share one (e.g. "../logs/{pid}.jsonl"), None for no file
+LOG_FILE_MAX_BYTES: int = 10 << 20 # Size, after which log file is rotated
+LOG_FILE_BACKUPS: int = 3 # How many rotated log files are kept
 
 INIT_DATA_TEMPLATE: dict[str: str | bool] = {
     "compilation_error": False,
     "compilation_error_details": "",
     "authorization": "",
+    "breakable_lines": [], # Lines, on which breakpoints can be set (others are moved to the next one of these)
     "status": "ok"
 }
 # If custom javascript is used, then "additional_gdb_information" might be also present
\ No newline at end of file
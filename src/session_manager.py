@@ -0,0 +1,216 @@
+import heapq
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator, Optional
+
+from gdb_manager import GDBDebugger
+from metrics_manager import lock_wait_seconds
+from worker_manager import SessionDirectory
+
+class SessionRegistry:
+	"""
+	Debugging sessions by authorization, indexed also by IP and Socket.IO sid.
+	Registry lock is held only while the registry is read or changed, GDB is used under the session's own lock (GDBDebugger.lock),
+	so a slow command of one session doesn't stop the others.
+	Session lives as long as its client is connected: it expires grace_time after the client's disconnect, or idle_timeout after the last action.
+	Expiry uses a min-heap of deadlines. Actions don't touch the heap, a session whose deadline has passed,
+	but which was used since, is just scheduled again. So cleaning looks only at sessions, whose deadline has come.
+	"""
+	def __init__(self, idle_timeout: float, grace_time: float, directory: Optional[SessionDirectory] = None) -> None:
+		"""
+		:param idle_timeout: After what time without an action is a connected session due for cleaning
+		:param grace_time: After what time after disconnect is a session due for cleaning
+		:param directory: Directory shared with other workers, where sessions of this registry are claimed
+		"""
+		self.idle_timeout = idle_timeout
+		self.grace_time = grace_time
+		self.directory = directory
+		self.lock = Lock()
+		self.sessions: dict[str: GDBDebugger] = {}
+		self.by_ip: dict[str: str] = {} # IP -> authorization
+		self.by_sid: dict[str: str] = {} # sid -> authorization
+		self.sids: dict[str: str] = {} # authorization -> sid of the client's last request
+		self.deadlines: list[tuple[float, str]] = [] # Heap of (deadline, authorization)
+		self.queued_steps: dict[str: list[int]] = {} # Authorization -> run of adjacent step requests waiting for the session's lock (one element list, the count), executed together
+		self.disconnected_at: dict[str: float] = {} # Authorization -> time, when its client disconnected
+
+	def __len__(self) -> int:
+		with self.lock:
+			return len(self.sessions)
+
+	def add(self, authorization: str, debugger: GDBDebugger) -> bool:
+		"""
+		Registers the session, unless there already is one from the same IP (on any worker)
+		:return: Was the session registered
+		"""
+		with self.lock:
+			if debugger.ip in self.by_ip:
+				return False
+			if self.directory and not self.directory.claim(authorization, debugger.ip):
+				return False
+			self.sessions[authorization] = debugger
+			self.by_ip[debugger.ip] = authorization
+			heapq.heappush(self.deadlines, (self.deadline(authorization), authorization))
+			return True
+
+	def get(self, authorization: str) -> Optional[GDBDebugger]:
+		with self.lock:
+			return self.sessions.get(authorization)
+
+	def remove(self, authorization: str, debugger: Optional[GDBDebugger] = None) -> Optional[GDBDebugger]:
+		"""
+		:param debugger: If given, the session is removed only if it is still this one
+		:return: Removed session, None if there was nothing to remove
+		"""
+		with self.lock:
+			session = self.sessions.get(authorization)
+			if session is None or (debugger is not None and session is not debugger):
+				return None
+			del self.sessions[authorization]
+			del self.by_ip[session.ip]
+			self.queued_steps.pop(authorization, None)
+			self.disconnected_at.pop(authorization, None)
+			if self.directory:
+				self.directory.release(authorization, session.ip)
+			sid = self.sids.pop(authorization, None)
+			if sid is not None:
+				del self.by_sid[sid]
+			return session # Its heap entry is dropped, when it comes up
+
+	def has_ip(self, ip: str) -> bool:
+		with self.lock:
+			return ip in self.by_ip
+
+	def bind_sid(self, authorization: str, sid: str) -> None:
+		"""
+		Remembers sid, from which the session was used the last time. Session with a connected client doesn't expire on disconnect timer
+		"""
+		with self.lock:
+			if authorization not in self.sessions:
+				return
+			self.disconnected_at.pop(authorization, None)
+			if self.sids.get(authorization) == sid:
+				return
+			old_sid = self.sids.get(authorization)
+			if old_sid is not None:
+				del self.by_sid[old_sid]
+			previous = self.by_sid.get(sid) # One client can have only one session
+			if previous is not None:
+				del self.sids[previous]
+			self.sids[authorization] = sid
+			self.by_sid[sid] = authorization
+
+	def sid_of(self, authorization: str) -> Optional[str]:
+		with self.lock:
+			return self.sids.get(authorization)
+
+	def unbind_sid(self, sid: str, now: float) -> Optional[str]:
+		"""
+		Starts grace time of the session, whose client has disconnected
+		:return: Authorization of the session, None if sid had no session
+		"""
+		with self.lock:
+			authorization = self.by_sid.pop(sid, None)
+			if authorization is None:
+				return None
+			del self.sids[authorization]
+			self.disconnected_at[authorization] = now
+			heapq.heappush(self.deadlines, (now + self.grace_time, authorization))
+			return authorization
+
+	def deadline(self, authorization: str) -> float:
+		"""
+		Called with the registry lock held
+		"""
+		if authorization in self.disconnected_at:
+			return self.disconnected_at[authorization] + self.grace_time
+		return self.sessions[authorization].last_ping_time + self.idle_timeout
+
+	def is_expired(self, authorization: str, now: float) -> bool:
+		with self.lock:
+			return authorization in self.sessions and now >= self.deadline(authorization)
+
+	def get_by_sid(self, sid: str) -> Optional[tuple[str, GDBDebugger]]:
+		with self.lock:
+			authorization = self.by_sid.get(sid)
+			return None if authorization is None else (authorization, self.sessions[authorization])
+
+	def due(self, now: float) -> list[tuple[str, GDBDebugger]]:
+		"""
+		Takes sessions, whose deadline has come, off the heap. Caller should either remove them or schedule them again
+		"""
+		due = []
+		with self.lock:
+			while self.deadlines and self.deadlines[0][0] <= now:
+				_, authorization = heapq.heappop(self.deadlines)
+				if authorization in self.sessions:
+					due.append((authorization, self.sessions[authorization]))
+		return due
+
+	def schedule(self, authorization: str, deadline: Optional[float] = None) -> None:
+		"""
+		:param deadline: Next time the session is checked, by default when it expires
+		"""
+		with self.lock:
+			if authorization not in self.sessions:
+				return
+			if deadline is None:
+				deadline = self.deadline(authorization)
+			heapq.heappush(self.deadlines, (deadline, authorization))
+
+	def queue_step(self, authorization: str) -> list[int]:
+		"""
+		Adds a step to the run of steps queued right before it
+		:return: The run, to be passed to take_steps
+		"""
+		with self.lock:
+			run = self.queued_steps.get(authorization)
+			if run is None:
+				run = [0]
+				if authorization in self.sessions:
+					self.queued_steps[authorization] = run
+			run[0] += 1
+			return run
+
+	def queue_action(self, authorization: str) -> None:
+		"""
+		Ends the current run of steps, so steps requested after another action don't get executed before it
+		"""
+		with self.lock:
+			self.queued_steps.pop(authorization, None)
+
+	def take_steps(self, authorization: str, run: list[int]) -> int:
+		"""
+		Session's lock is taken in the order of requests, so the first step of a run takes all of them
+		:return: How many steps of the run are to be executed. 0 means, that they were already executed by an earlier request
+		"""
+		with self.lock:
+			if self.queued_steps.get(authorization) is run:
+				del self.queued_steps[authorization]
+			steps, run[0] = run[0], 0
+			return steps
+
+	def snapshot(self) -> list[tuple[str, GDBDebugger]]:
+		with self.lock:
+			return list(self.sessions.items())
+
+	@contextmanager
+	def session(self, authorization: str) -> Iterator[Optional[GDBDebugger]]:
+		"""
+		Holds the session's lock for the duration of the block.
+		Session stopped before or during the block (stop, program's exit) is removed right away, so its IP can start a new session
+		:return: Running session, None if there is no such session or it has been stopped
+		"""
+		debugger = self.get(authorization)
+		if debugger is None:
+			yield None
+			return
+
+		with lock_wait_seconds.time():
+			debugger.lock.acquire()
+		try:
+			yield debugger if debugger.process else None
+		finally:
+			if not debugger.process:
+				self.remove(authorization, debugger)
+			debugger.lock.release()
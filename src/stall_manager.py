@@ -0,0 +1,74 @@
+import sys
+import traceback
+import eventlet
+from eventlet import patcher
+from collections import deque
+from time import perf_counter, time
+from typing import Any, Optional
+
+from logger import Logger
+from metrics_manager import event_loop_lag_seconds, event_loop_stall_seconds
+
+# Not monkey patched, so the sampler runs in its own OS thread and sees the event loop, while it is blocked
+real_threading = patcher.original("threading")
+real_time = patcher.original("time")
+
+class StallDetector:
+	"""
+	Measures, how late the event loop wakes up a sleeping green thread (scheduling lag).
+	While the loop is blocked, no green thread runs, so a real OS thread watches the last heartbeat and,
+	when it is older than threshold, takes the stack of the loop's thread - the code, which is blocking it.
+	When nothing blocks, it costs one wakeup of each thread per interval.
+	"""
+	def __init__(self, logger: Logger, interval: float, threshold: float, max_stalls: int):
+		"""
+		:param interval: How often the lag is measured
+		:param threshold: Lag, above which the loop is considered stalled
+		:param max_stalls: How many last stalls are kept
+		"""
+		self.logger = logger
+		self.interval = interval
+		self.threshold = threshold
+		self.stalls: deque[dict[str, Any]] = deque(maxlen=max_stalls)
+
+		self.heartbeat: float = perf_counter()
+		self.loop_thread: Optional[int] = None
+		self.stack: Optional[tuple[float, list[str]]] = None # (heartbeat, stack) captured during the stall, which began after that heartbeat
+
+	def start(self) -> None:
+		"""
+		Has to be called from the event loop's thread
+		"""
+		self.loop_thread = real_threading.get_ident()
+		eventlet.spawn_n(self.watch)
+		real_threading.Thread(target=self.sample, name="stall-sampler", daemon=True).start()
+
+	def watch(self) -> None:
+		while True:
+			start = perf_counter()
+			self.heartbeat = start
+			self.stack = None # Loop runs, so a stack sampled before belongs to a stall, which is over
+			eventlet.sleep(self.interval)
+			lag = max(0, perf_counter() - start - self.interval)
+			event_loop_lag_seconds.observe(lag)
+
+			if lag > self.threshold:
+				self.record(lag, start)
+
+	def sample(self) -> None:
+		while True:
+			real_time.sleep(self.interval)
+			heartbeat = self.heartbeat
+			if (self.stack is None or self.stack[0] != heartbeat) and perf_counter() - heartbeat > self.interval + self.threshold:
+				frame = sys._current_frames().get(self.loop_thread)
+				self.stack = (heartbeat, traceback.format_stack(frame) if frame else [])
+
+	def record(self, lag: float, heartbeat: float) -> None:
+		"""
+		:param heartbeat: Heartbeat, after which the stall began. Only a stack sampled after it is reported
+		"""
+		sample, self.stack = self.stack, None
+		stack = sample[1] if sample is not None and sample[0] == heartbeat else []
+		event_loop_stall_seconds.observe(lag)
+		self.stalls.append({"time": time(), "duration": lag, "stack": stack})
+		self.logger.alert("Event loop was stalled for {:.3f}s, blocked in:\n{}", self.watch, lag, "".join(stack) or "(not captured)")
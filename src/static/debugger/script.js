@@ -1,15 +1,15 @@
 const socket = io({
+    transports: ["websocket"], // Without long polling whole connection stays on one server worker
     reconnection: true,
     reconnectionDelay: 1000,
     reconnectionDelayMax: 5000,
     reconnectionAttempts: Infinity,
 });
 
-const ping_back_after = 3000; // Delay before ping after server's PONG reponse
-
 var editor; // codemirror variable
 var last_highlighted;
 var is_running = false;
+var types = {}; // Type dictionary, server sends every type only once (id -> type name)
 
 // Enable debugging gui and disable pre-debugging gui
 async function turn_gui_into_debugging() {
@@ -31,6 +31,23 @@ async function turn_gui_back_from_debugging(timeout, runtime_error, runtime_erro
     }
 }
 
+// Turns structured value from the server into a readable text
+function format_value(value, indent = "") {
+    const inner = indent + "  ";
+    switch (value.kind) {
+        case "array":
+            return "[\n" + value.items.map((item) => inner + format_value(item, inner)).join(",\n") + (value.truncated ? ",\n" + inner + "..." : "") + "\n" + indent + "]";
+        case "repeat":
+            return format_value(value.value, indent) + " <repeats " + value.count + " times>";
+        case "map":
+            return "{\n" + value.entries.map(([k, v]) => inner + format_value(k, inner) + ": " + format_value(v, inner)).join(",\n") + (value.truncated ? ",\n" + inner + "..." : "") + "\n" + indent + "}";
+        case "struct":
+            return "{\n" + value.fields.map(([name, v]) => inner + name + " = " + format_value(v, inner)).join(",\n") + "\n" + indent + "}";
+        default:
+            return String(value.value);
+    }
+}
+
 // Function to sleep in async function
 function sleep(time_in_miliseconds) {
     return new Promise((resolve) => setTimeout(resolve, time_in_miliseconds));
@@ -47,6 +64,23 @@ async function highlightLine(lineNumber) {
 // Connection debuginfo
 socket.on("connect", () => {
     console.log("Socket is connected!");
+
+    // After reconnect the session is still on the server, it only has to be reattached
+    if (is_running && authorization) {
+        socket.emit("resume_debugging", {authorization: authorization});
+    }
+})
+
+// Session was reattached after reconnect, its state follows as "debug_data" or "still_running"
+socket.on("resumed_debugging", async (data) => {
+    if (data.status != "ok") {
+        turn_gui_back_from_debugging();
+        document.getElementById("statusDetails").textContent = data.status;
+        is_running = false;
+        return;
+    }
+    document.getElementById("status").textContent = "Połączono ponownie z debuggerem";
+    document.getElementById("programOutput").textContent = (data.truncated ? "[...]\n" : "") + data.output;
 })
 
 // Deconnection debuginfo
@@ -55,6 +89,27 @@ socket.on("disconnect", () => {
 })
 
 // When server responds after start_debugging
+// Server is full, request waits in the queue (sent periodically)
+socket.on("queue_position", async (data) => {
+    document.getElementById("status").textContent = "Czekasz w kolejce: pozycja " + data.position + ", szacowany czas oczekiwania: " + data.eta + " s";
+})
+
+// After restart_debugging (session keeps running with the old program, if new code doesn't compile)
+socket.on("restarted_debugging", async (data) => {
+    if (data.status != "ok") {
+        document.getElementById("status").textContent = "Nie udało się uruchomić ponownie";
+        document.getElementById("statusDetails").textContent = data.status;
+    } else if (data.compilation_error) {
+        document.getElementById("status").textContent = "Błąd kompilacji! Debugowany jest nadal poprzedni program";
+        document.getElementById("statusDetails").textContent = data.compilation_error_details;
+    } else {
+        types = {}; // Type ids start from the beginning
+        document.getElementById("status").textContent = "Uruchomiono program ponownie";
+        document.getElementById("statusDetails").textContent = "";
+        document.getElementById("programOutput").textContent = "";
+    }
+})
+
 socket.on("started_debugging", async (data) => {
     if (data.compilation_error) {
         turn_gui_back_from_debugging();
@@ -71,21 +126,20 @@ socket.on("started_debugging", async (data) => {
         auth = data.authorization;
         authorization = data.authorization;
         console.log("Started debugging, auth:", auth);
-
-        await socket.emit("ping", {authorization: auth});
     }
 })
 
-// When server responds on pinging
-socket.on("pong", async (data) => {
-    console.log("Server responded! Status:", data.status);
-
-    if (!is_running) return;
-
-    await sleep(ping_back_after);
+// New output of debugged program (server sends only what was written since the last time)
+socket.on("program_output", async (data) => {
+    if (data.truncated) {
+        document.getElementById("programOutput").textContent += "\n[...]\n";
+    }
+    document.getElementById("programOutput").textContent += data.output;
+})
 
-    console.log("Now we ping back");
-    await socket.emit("ping", {authorization: auth});
+// Program is still running after step/continue/finish (server sends it periodically, until program stops)
+socket.on("still_running", async (data) => {
+    document.getElementById("status").textContent = "Program działa... (czas CPU: " + data.cpu_time.toFixed(1) + " s)";
 })
 
 // After some action receive debugging information
@@ -93,13 +147,23 @@ socket.on("debug_data", async (data) => {
     console.log("Server responded! Status:", data.status);
     console.log(data);
 
+    if (data.profile) { // Only when server sends extractor's costs (EXTRACTOR_PROFILE_TO_CLIENT)
+        console.table(data.profile.printers);
+        console.table(data.profile.variables);
+    }
+
     if (data.status != "ok") {
         console.log("Something went wrong... Status is not ok!");
         return;
     }
 
+    Object.assign(types, data.types);
     highlightLine(data.line)
 
+    if (data.cpu_time_limit_exceeded) {
+        document.getElementById("status").textContent = "Program przekroczył limit czasu CPU i został wstrzymany";
+    }
+
     is_running = data.is_running;
 
     if (!is_running) {
@@ -113,7 +177,7 @@ socket.on("debug_data", async (data) => {
         document.getElementById("variablesInfo").textContent = "";
           
         data.local_variables.forEach(element => {
-            document.getElementById("variablesInfo").textContent += JSON.stringify(element, null, 2) + "\n";
+            document.getElementById("variablesInfo").textContent += types[element.variable_type] + " " + element.variable_name + " = " + format_value(element.variable_value) + "\n";
         });
     }
 })
@@ -139,11 +203,14 @@ document.getElementById("debugStart").addEventListener("click", async () => {
     document.getElementById("status").textContent = "Wysłano prośbę o rozpoczęcie debugowania";
     document.getElementById("statusDetails").textContent = "";
 
+    document.getElementById("programOutput").textContent = "";
+
     await socket.emit("start_debugging", {code: editor.getValue(), input: ""});
 })
 
 //
 // "add_breakpoints" and "remove_breakpoints" should be arrays of integers
+// instead of them, "breakpoints" (array of all lines with breakpoints) can be sent
 //
 
 // Listens for stepping
@@ -161,6 +228,17 @@ document.getElementById("zakonczFunkcje").addEventListener("click", async () =>
     await socket.emit("finish", {authorization: authorization, add_breakpoints: [], remove_breakpoints: []});
 })
 
+// Listen for restarting with current code
+document.getElementById("uruchomPonownie").addEventListener("click", async () => {
+    document.getElementById("status").textContent = "Wysłano prośbę o ponowne uruchomienie";
+    await socket.emit("restart_debugging", {authorization: authorization, code: editor.getValue(), input: ""});
+})
+
+// Listen for pausing running program
+document.getElementById("wstrzymajWykonanie").addEventListener("click", async () => {
+    await socket.emit("pause", {authorization: authorization});
+})
+
 // Listen sfor stopping
 document.getElementById("zakonczDebugowanie").addEventListener("click", async () => {
     await socket.emit("stop", {authorization: authorization});
@@ -0,0 +1,103 @@
+import os
+import random
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from server import TRACE_SAMPLE_RATE, TRACE_MAX_SPANS, TRACE_MAX_SESSIONS
+
+class SessionTrace:
+	"""
+	Spans of one session as Chrome trace events, only the last max_spans are kept
+	"""
+	def __init__(self, max_spans: int):
+		self.events: deque[dict[str, Any]] = deque(maxlen=max_spans)
+		self.recorded: int = 0
+
+	def add(self, name: str, start: float, end: float, args: dict[str, Any]) -> None:
+		self.recorded += 1
+		self.events.append({"name": name, "ph": "X", "ts": start * 1e6, "dur": (end - start) * 1e6, "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+	def export(self) -> dict[str: Any]:
+		return {"traceEvents": list(self.events), "displayTimeUnit": "ms", "otherData": {"dropped_spans": self.recorded - len(self.events)}}
+
+class Span:
+	"""
+	Records the with block as a span of the trace
+	"""
+	def __init__(self, trace: SessionTrace, name: str, args: dict[str, Any]):
+		self.trace = trace
+		self.name = name
+		self.args = args
+		self.start: float = 0
+
+	def __enter__(self) -> "Span":
+		self.start = perf_counter()
+		return self
+
+	def __exit__(self, *exception: object) -> None:
+		self.trace.add(self.name, self.start, perf_counter(), self.args)
+
+class NoSpan:
+	"""
+	Used, when the current session isn't traced, so disabled tracing costs only a context variable lookup
+	"""
+	def __enter__(self) -> "NoSpan":
+		return self
+
+	def __exit__(self, *exception: object) -> None:
+		pass
+
+NO_SPAN = NoSpan()
+
+class Tracer:
+	"""
+	Sampled per-session tracing. Session is chosen for tracing at its start, its trace is kept (also after it ends) until max_sessions newer ones push it out.
+	Trace of the session handled by the current green thread is kept in a context variable, so spans deep in the call stack don't need the session passed to them.
+	"""
+	def __init__(self, sample_rate: float, max_spans: int, max_sessions: int):
+		self.sample_rate = sample_rate
+		self.max_spans = max_spans
+		self.max_sessions = max_sessions
+		self.traces: OrderedDict[str, SessionTrace] = OrderedDict()
+		self.current: ContextVar[Optional[SessionTrace]] = ContextVar("current_trace", default=None)
+
+	def begin(self, session: str) -> None:
+		"""
+		Decides, if a new session is traced, and makes it the current one
+		"""
+		trace = None
+		if random.random() < self.sample_rate:
+			trace = self.traces[session] = SessionTrace(self.max_spans)
+			while len(self.traces) > self.max_sessions:
+				self.traces.popitem(last=False)
+		self.current.set(trace)
+
+	def attach(self, session: str) -> None:
+		"""
+		Makes the session current in this green thread (no-op for sessions, which aren't traced)
+		"""
+		self.current.set(self.traces.get(session))
+
+	def span(self, name: str, **args: Any) -> Span | NoSpan:
+		trace = self.current.get()
+		return NO_SPAN if trace is None else Span(trace, name, args)
+
+	def export(self, session: str) -> Optional[dict[str, Any]]:
+		trace = self.traces.get(session)
+		return trace.export() if trace else None
+
+tracer = Tracer(TRACE_SAMPLE_RATE, TRACE_MAX_SPANS, TRACE_MAX_SESSIONS)
+
+# Decorator recording every call of the function as a span
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+	def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+		@wraps(function)
+		def wrapper(*args: Any, **kwargs: Any) -> Any:
+			with tracer.span(name):
+				return function(*args, **kwargs)
+		return wrapper
+	return decorator
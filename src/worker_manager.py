@@ -0,0 +1,198 @@
+import os
+import json
+import socket
+import eventlet
+from eventlet.queue import LightQueue
+from hashlib import sha1
+from os.path import join
+from socketio import PubSubManager
+from typing import Any, Callable, Iterator, Optional
+
+from logger import Logger
+
+def is_worker_alive(pid: int) -> bool:
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass
+	return True
+
+class SessionDirectory:
+	"""
+	Sessions of all workers, kept as files in a directory shared by them.
+	Tells which worker (process id) owns a session and keeps one session per IP across workers. Claims of dead workers are taken over.
+	"""
+	def __init__(self, path: str):
+		"""
+		:param path: Directory shared by workers
+		"""
+		self.path = path
+		self.worker_id = os.getpid()
+		os.makedirs(self.path, exist_ok=True)
+		os.makedirs(join(self.path, "queue"), exist_ok=True)
+
+	def session_file(self, authorization: str) -> str:
+		return join(self.path, f"session-{authorization}")
+
+	def ip_file(self, ip: str) -> str:
+		return join(self.path, f"ip-{sha1(ip.encode('utf-8')).hexdigest()}")
+
+	def socket_file(self, worker_id: int) -> str:
+		return join(self.path, f"worker-{worker_id}.sock")
+
+	def queue_file(self, worker_id: int) -> str:
+		return join(self.path, "queue", f"{worker_id}.sock")
+
+	def queue_workers(self) -> list[int]:
+		"""
+		:return: Workers listening for Socket.IO messages (see WorkerMessageQueue), without this one
+		"""
+		return [int(name.split(".")[0]) for name in os.listdir(join(self.path, "queue")) if name.endswith(".sock") and name != f"{self.worker_id}.sock"]
+
+	def read_owner(self, file_name: str) -> Optional[int]:
+		try:
+			with open(file_name, "r") as f:
+				return int(f.read().split()[0])
+		except (FileNotFoundError, ValueError, IndexError):
+			return None
+
+	def claim(self, authorization: str, ip: str) -> bool:
+		"""
+		Makes this worker the owner of the session
+		:return: False, if a living worker already has a session from this IP
+		"""
+		for _ in range(2):
+			try:
+				fd = os.open(self.ip_file(ip), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+			except FileExistsError:
+				owner = self.read_owner(self.ip_file(ip))
+				if owner is not None and is_worker_alive(owner):
+					return False
+				try: os.remove(self.ip_file(ip)) # Left by a dead worker
+				except FileNotFoundError: pass
+				continue
+
+			with os.fdopen(fd, "w") as f:
+				f.write(f"{self.worker_id} {authorization}")
+			with open(self.session_file(authorization), "w") as f:
+				f.write(str(self.worker_id))
+			return True
+		return False
+
+	def owner(self, authorization: str) -> Optional[int]:
+		"""
+		:return: Process id of the worker owning the session, None if there is no such session
+		"""
+		owner = self.read_owner(self.session_file(authorization))
+		if owner is not None and not is_worker_alive(owner):
+			self.release(authorization)
+			return None
+		return owner
+
+	def release(self, authorization: str, ip: Optional[str] = None) -> None:
+		for file_name in [self.session_file(authorization)] + ([self.ip_file(ip)] if ip is not None else []):
+			try: os.remove(file_name)
+			except FileNotFoundError: pass
+
+class WorkerLink:
+	"""
+	Passes session events to the worker owning the session.
+	Every worker listens on a unix socket in the session directory, a forwarded event is one JSON line.
+	The owner handles it and emits the response to client's sid through Socket.IO message queue, so it reaches the worker client is connected to.
+	"""
+	def __init__(self, logger: Logger, directory: SessionDirectory, handle_event: Callable[[str, dict[str, str], str], None]):
+		"""
+		:param handle_event: Called with (event, data, sid) for every event forwarded to this worker
+		"""
+		self.logger = logger
+		self.directory = directory
+		self.handle_event = handle_event
+
+	def serve(self) -> None:
+		"""
+		Accepts forwarded events, meant to be run as a background task
+		"""
+		path = self.directory.socket_file(self.directory.worker_id)
+		try: os.remove(path)
+		except FileNotFoundError: pass
+
+		server = eventlet.listen(path, family=socket.AF_UNIX)
+		while True:
+			connection, _ = server.accept()
+			eventlet.spawn_n(self.receive, connection)
+
+	def receive(self, connection: socket.socket) -> None:
+		try:
+			with connection.makefile("r", encoding="utf-8") as f:
+				message = json.loads(f.readline())
+			self.handle_event(message["event"], message["data"], message["sid"])
+		except Exception as e:
+			self.logger.error("Couldn't handle forwarded event: {}", self.receive, e)
+		finally:
+			connection.close()
+
+	def forward(self, worker_id: int, event: str, data: dict[str, str], sid: str) -> bool:
+		"""
+		:return: Was the event delivered to the worker
+		"""
+		try:
+			with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+				connection.connect(self.directory.socket_file(worker_id))
+				connection.sendall((json.dumps({"event": event, "data": data, "sid": sid}) + "\n").encode("utf-8"))
+			return True
+		except OSError as e:
+			self.logger.warn("Couldn't forward \"{}\" to worker {}: {}", self.forward, event, worker_id, e)
+			return False
+
+class WorkerMessageQueue(PubSubManager):
+	"""
+	Socket.IO message queue between workers of one host, used when SOCKETIO_MESSAGE_QUEUE (e.g. redis) isn't set.
+	Every worker listens on a unix socket in the session directory, a message is one JSON line sent to every other worker.
+	Emits to a client connected to this worker aren't published at all. Used only with more than one worker (see WORKERS).
+	"""
+	name = "worker"
+
+	def __init__(self, directory: SessionDirectory, channel: str = "flask-socketio"):
+		self.directory = directory
+		super().__init__(channel=channel)
+
+	def _publish(self, data: dict[str, Any]) -> None:
+		if data.get("method") == "emit" and data.get("room") is not None and self.is_connected(data["room"], data.get("namespace") or "/"):
+			return # Sent to a client of this worker, it has been emitted already
+
+		message = (json.dumps(data) + "\n").encode("utf-8")
+		for worker_id in self.directory.queue_workers():
+			try:
+				with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+					connection.connect(self.directory.queue_file(worker_id))
+					connection.sendall(message)
+			except OSError:
+				if not is_worker_alive(worker_id): # Left by a dead worker
+					try: os.remove(self.directory.queue_file(worker_id))
+					except FileNotFoundError: pass
+
+	def _listen(self) -> Iterator[str]:
+		path = self.directory.queue_file(self.directory.worker_id)
+		try: os.remove(path)
+		except FileNotFoundError: pass
+
+		# Every connection is read by its own green thread, so a stalled worker doesn't hold up messages of the others
+		messages: LightQueue = LightQueue()
+		eventlet.spawn_n(self.accept, eventlet.listen(path, family=socket.AF_UNIX), messages)
+		while True:
+			yield messages.get()
+
+	def accept(self, server: socket.socket, messages: LightQueue) -> None:
+		while True:
+			connection, _ = server.accept()
+			eventlet.spawn_n(self.receive, connection, messages)
+
+	def receive(self, connection: socket.socket, messages: LightQueue) -> None:
+		try:
+			with connection, connection.makefile("r", encoding="utf-8") as f:
+				for line in f:
+					messages.put(line)
+		except OSError: # Worker has died while sending
+			pass
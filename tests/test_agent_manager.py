@@ -0,0 +1,18 @@
+from uuid import uuid4
+
+from agent_manager import is_valid_session_name, is_authenticated
+
+def test_session_name_is_uuid_source():
+	assert is_valid_session_name(f"{uuid4()}.cpp")
+
+def test_session_name_rejects_paths():
+	for session in ["../../etc/cron.d/x", f"../{uuid4()}.cpp", f"{uuid4()}.cpp/..", f"/tmp/{uuid4()}.cpp", f"{uuid4()}.py", f"{uuid4()}.cpp\n", "", None, 1, ["a"]]:
+		assert not is_valid_session_name(session), session
+
+def test_authentication_needs_the_secret():
+	assert is_authenticated({"secret": "s3cret"}, "s3cret")
+	assert not is_authenticated({"secret": "wrong"}, "s3cret")
+	assert not is_authenticated({"secret": ""}, "s3cret")
+	assert not is_authenticated({"id": 1, "method": "create", "params": {}}, "s3cret")
+	assert not is_authenticated(None, "s3cret")
+	assert not is_authenticated({"secret": 1}, "s3cret")
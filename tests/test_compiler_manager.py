@@ -0,0 +1,32 @@
+import shutil
+from uuid import uuid4
+
+import pytest
+
+from compiler_manager import Compiler
+from logger import Logger
+
+CODE = """int main() {
+	int a = 1;
+	a++;
+
+	return a;
+}
+"""
+
+@pytest.mark.skipif(not shutil.which("g++") or not shutil.which("objdump"), reason="g++ and objdump are needed")
+def test_line_table_of_uuid_named_source(tmp_path):
+	# Uploaded sources are named "<uuid4>.cpp", longer than objdump's default file name column
+	source = f"{uuid4()}.cpp"
+	(tmp_path / source).write_text(CODE)
+
+	compiler = Compiler(Logger(display_logs=False), "g++", str(tmp_path), str(tmp_path))
+	target, errors = compiler.compile(source)
+	assert errors == b""
+
+	table = compiler.line_table(target, source)
+	assert {2, 3, 5} <= set(table)
+	assert 4 not in table
+	assert all(addresses for addresses in table.values())
+
+	assert compiler.line_table(target, source) == table # From cache
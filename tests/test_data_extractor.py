@@ -0,0 +1,71 @@
+import ast
+import os
+import shutil
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODE = """#include <map>
+#include <set>
+#include <vector>
+
+int main() {
+	std::vector<std::vector<int>> g(100);
+	std::vector<std::set<int>> s(100);
+	std::map<int, std::vector<int>> m;
+	for (int i = 0; i < 100; i++) {
+		g[i] = {i, i + 1};
+		s[i] = {i, -i - 1};
+		m[i] = {i};
+	}
+	return 0;
+}
+"""
+
+def extract(tmp_path) -> dict:
+	'''
+	Runs extractor in GDB at the return of CODE, set up as in the debugger's container
+	'''
+	(tmp_path / "main.cpp").write_text(CODE)
+	subprocess.check_call(["g++", "-g", "-O0", "-o", str(tmp_path / "a.out"), str(tmp_path / "main.cpp")])
+
+	printers = tmp_path / "python" / "libstdcxx" / "v6"
+	printers.mkdir(parents=True)
+	(tmp_path / "python" / "libstdcxx" / "__init__.py").write_text("")
+	(printers / "__init__.py").write_text("")
+	shutil.copy(os.path.join(ROOT, "gdb_printer", "printers.py"), printers / "printers.py")
+	shutil.copy(os.path.join(ROOT, "data_extractor", "main.py"), tmp_path / "data_extractor.py")
+
+	commands = [
+		f"python import sys; sys.path.insert(0, '{tmp_path / 'python'}')",
+		"python from libstdcxx.v6.printers import register_libstdcxx_printers",
+		"python register_libstdcxx_printers(None)",
+		f"python sys.path.insert(0, '{tmp_path}')",
+		"python import data_extractor",
+		f"python data_extractor.OUTPUT_FILE = '{tmp_path / 'output'}'",
+		"break 14",
+		"run",
+		"python print('DATA', repr(data_extractor.main()))",
+	]
+	args = ["gdb", "-batch", "-nx"]
+	for command in commands:
+		args += ["-ex", command]
+	output = subprocess.check_output(args + [str(tmp_path / "a.out")], text=True, timeout=60)
+	data = next(line for line in output.splitlines() if line.startswith("DATA "))
+	return ast.literal_eval(data[len("DATA "):])
+
+@pytest.mark.skipif(not shutil.which("g++") or not shutil.which("gdb"), reason="g++ and gdb are needed")
+def test_small_nested_containers_are_all_extracted(tmp_path):
+	variables = {variable["variable_name"]: variable["variable_value"] for variable in extract(tmp_path)["local_variables"]}
+
+	for name in ["g", "s"]:
+		rows = variables[name]["items"]
+		assert not variables[name]["truncated"]
+		assert len(rows) == 100
+		assert all(not row["truncated"] and len(row["items"]) == 2 for row in rows), name
+
+	assert not variables["m"]["truncated"]
+	assert len(variables["m"]["entries"]) == 100
+	assert all(not value["truncated"] and len(value["items"]) == 1 for _, value in variables["m"]["entries"])
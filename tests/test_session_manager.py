@@ -0,0 +1,61 @@
+import time
+from threading import Thread
+from types import SimpleNamespace
+
+from fair_lock import FairLock
+from session_manager import SessionRegistry
+from worker_manager import SessionDirectory
+
+def fake_debugger() -> SimpleNamespace:
+	return SimpleNamespace(ip="127.0.0.1", last_ping_time=time.time(), lock=FairLock(), process=object())
+
+def registry_with_session(authorization: str) -> SessionRegistry:
+	registry = SessionRegistry(idle_timeout=60, grace_time=60)
+	assert registry.add(authorization, fake_debugger())
+	return registry
+
+def test_adjacent_steps_are_executed_together():
+	registry = registry_with_session("a")
+	runs = [registry.queue_step("a") for _ in range(3)]
+	assert [registry.take_steps("a", run) for run in runs] == [3, 0, 0]
+
+def test_steps_are_not_merged_over_another_action():
+	registry = registry_with_session("a")
+	first = registry.queue_step("a")
+	registry.queue_action("a") # e.g. continue
+	second = registry.queue_step("a")
+	assert registry.take_steps("a", first) == 1
+	assert registry.take_steps("a", second) == 1
+
+def test_ip_can_start_again_right_after_stop(tmp_path):
+	registry = SessionRegistry(idle_timeout=60, grace_time=60, directory=SessionDirectory(str(tmp_path)))
+	assert registry.add("a", fake_debugger())
+	registry.bind_sid("a", "sid")
+
+	with registry.session("a") as debugger:
+		debugger.process = None # What stop() (or program's exit) does
+
+	assert len(registry) == 0
+	assert not registry.has_ip("127.0.0.1")
+	assert registry.add("b", fake_debugger())
+
+def test_fair_lock_is_taken_in_order():
+	lock = FairLock()
+	order = []
+
+	def take(i: int) -> None:
+		with lock:
+			order.append(i)
+
+	lock.acquire()
+	threads = []
+	for i in range(5):
+		threads.append(Thread(target=take, args=(i,)))
+		threads[-1].start()
+		while len(lock.waiters) <= i: # Thread i waits, before the next one comes
+			time.sleep(0.001)
+	lock.release()
+	for thread in threads:
+		thread.join()
+	assert order == list(range(5))
+	assert lock.acquire(blocking=False)
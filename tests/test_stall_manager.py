@@ -0,0 +1,14 @@
+from logger import Logger
+from stall_manager import StallDetector
+
+def test_stall_is_reported_only_with_its_own_stack():
+	detector = StallDetector(Logger(display_logs=False), interval=0.1, threshold=0.5, max_stalls=10)
+
+	detector.stack = (1.0, ["earlier stall\n"]) # Sampled, when the loop had already recovered
+	detector.record(2.0, 5.0)
+	assert detector.stalls[-1]["stack"] == []
+
+	detector.stack = (5.0, ["this stall\n"])
+	detector.record(2.0, 5.0)
+	assert detector.stalls[-1]["stack"] == ["this stall\n"]
+	assert detector.stack is None
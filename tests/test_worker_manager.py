@@ -0,0 +1,25 @@
+import json
+
+import eventlet
+from eventlet.green import socket
+
+from worker_manager import SessionDirectory, WorkerMessageQueue
+
+def test_stalled_worker_doesnt_block_messages(tmp_path):
+	directory = SessionDirectory(str(tmp_path))
+	messages = WorkerMessageQueue(directory)._listen()
+	received = eventlet.spawn(next, messages)
+	eventlet.sleep(0.1) # Starts listening
+
+	stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	stalled.connect(directory.queue_file(directory.worker_id))
+	stalled.sendall(b'{"method": "emit"') # Never finished
+
+	message = json.dumps({"method": "emit", "event": "debug_data"}) + "\n"
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+		connection.connect(directory.queue_file(directory.worker_id))
+		connection.sendall(message.encode("utf-8"))
+
+	with eventlet.Timeout(5):
+		assert received.wait() == message
+	stalled.close()